@@ -0,0 +1,249 @@
+from re import search
+from typing import Dict, List
+from base64 import b64decode
+from urllib.parse import urlparse, parse_qs, unquote
+from selectolax.parser import HTMLParser, Node
+from wawacity.core.config import WAWACITY_URL
+from wawacity.scrapers.base import PageContext
+from wawacity.scrapers.parsing import extract_link_from_node
+from wawacity.scrapers.movie import MovieScraper
+from wawacity.scrapers.series import SeriesScraper
+from wawacity.utils.helpers import format_url
+from wawacity.utils.logger import logger
+
+# --- Per-row selector implementation, kept as a benchmark baseline ---
+
+def _filter_nodes(nodes: List[Node], pattern: str) -> List[Node]:
+    filtered = []
+    for node in nodes:
+        if isinstance(node, Node) and search(pattern, node.text()):
+            filtered.append(node)
+    return filtered
+
+def _extract_filename_from_link(url: str, link_text: str) -> str:
+    # --- First try from link text ---
+    original_filename = link_text.split(":")[-1].strip() if ":" in link_text else link_text.strip()
+    
+    # --- Then try decoding from URL ---
+    try:
+        parsed_url = urlparse(url)
+        query_params = parse_qs(parsed_url.query)
+        fn_encoded = query_params.get('fn', [None])[0]
+        
+        if fn_encoded:
+            fn_unquoted = unquote(fn_encoded)
+            decoded_fn = b64decode(fn_unquoted).decode('utf-8')
+            return decoded_fn if decoded_fn else original_filename
+    except Exception:
+        pass
+    
+    return original_filename
+
+class LegacyMovieScraper(MovieScraper):
+
+    # --- Extract links for specific quality ---
+    async def _extract_links_for_quality(self, quality_data: Dict, context: PageContext) -> List[Dict]:
+        results = []
+        page_path = quality_data.get("page_path", "")
+        quality_txt = quality_data.get("quality", "?")
+        language_txt = quality_data.get("language", "N/A")
+        
+        if not page_path:
+            return results
+        
+        movie_page_url = f"{WAWACITY_URL}/{page_path}"
+        
+        try:
+            parser = await context.get(movie_page_url, HTMLParser)
+            if not parser:
+                return results
+            
+            link_rows = parser.css('#DDLLinks tr.link-row:nth-child(n+2)')
+            
+            if not link_rows:
+                logger.log("SCRAPER", f"No links for quality '{quality_txt} ({language_txt})'")
+                return results
+            
+            # --- Filter rows with "Lien" ---
+            filtered_rows = _filter_nodes(link_rows, r"Lien .*")
+            if not filtered_rows:
+                return results
+            
+            all_links = []
+            primary_metadata = None
+            
+            # --- Extract links ---
+            for row in filtered_rows:
+                hoster_cell = row.css_first('td[width="120px"].text-center')
+                hoster_name = hoster_cell.text().strip() if hoster_cell else ""
+                
+                # --- Filter supported hosters ---
+                if hoster_name.lower() not in ["1fichier", "turbobit", "rapidgator"]:
+                    continue
+                
+                size_td = row.css_first('td[width="80px"].text-center')
+                file_size = size_td.text().strip() if size_td else "?"
+                
+                link_node = row.css_first('a[href*="dl-protect."].link')
+                if not link_node:
+                    continue
+                
+                url = extract_link_from_node(link_node)
+                if not url:
+                    continue
+                
+                url = format_url(url, WAWACITY_URL)
+                
+                # --- Extract filename ---
+                link_text = link_node.text(strip=True) if link_node else ""
+                original_filename = link_text.split(":")[-1].strip() if ":" in link_text else ""
+                
+                all_links.append({
+                    "hoster": hoster_name.lower(),
+                    "url": url
+                })
+                
+                # --- Save primary metadata ---
+                if not primary_metadata:
+                    primary_metadata = {
+                        "size": file_size,
+                        "display_name": original_filename
+                    }
+            
+            # --- Create results for each link ---
+            for link_data in all_links:
+                hoster_name = link_data["hoster"].title()
+                results.append({
+                    "label": f"{quality_txt} - {language_txt} ({hoster_name})",
+                    "language": language_txt,
+                    "quality": quality_txt,
+                    "hoster": hoster_name,
+                    "size": primary_metadata.get("size", "?") if primary_metadata else "?",
+                    "dl_protect": link_data["url"],
+                    "display_name": primary_metadata.get("display_name", "?") if primary_metadata else "?"
+                })
+            
+        except Exception as e:
+            logger.error(f"Failed to extract links for quality '{quality_txt}': {e}")
+        
+        return results
+
+class LegacySeriesScraper(SeriesScraper):
+
+    # --- Extract episodes from single page ---
+    async def _extract_episodes_from_page(self, series_page: Dict, context: PageContext) -> List[Dict]:
+        page_results = []
+        page_path = series_page.get("page_path", "")
+        default_quality = series_page.get("quality", "N/A")
+        default_language = series_page.get("language", "N/A")
+        
+        if not page_path:
+            return page_results
+        
+        series_page_url = f"{WAWACITY_URL}/{page_path}"
+        
+        try:
+            parser = await context.get(series_page_url, HTMLParser)
+            if not parser:
+                return page_results
+            
+
+            # --- Get all rows from DDLLinks table ---
+            link_rows = parser.css('#DDLLinks tr')
+            if not link_rows:
+                logger.log("SCRAPER", f"No download links for page: {page_path}")
+                return page_results
+            
+            current_episode = None
+            current_season = "1"
+            current_page_language = default_language
+            current_page_quality = default_quality
+            
+            for row in link_rows:
+                # --- Check if episode title row ---
+                row_class = str(row.attributes.get("class", ""))
+                if "episode-title" in row_class:
+                    episode_text = row.text(strip=True)
+                    
+                    if "Épisode" in episode_text:
+                        # --- Extract episode number ---
+                        episode_match = search(r"Épisode (\d+)", episode_text)
+                        current_episode = episode_match.group(1) if episode_match else "1"
+                        
+                        # --- Extract season if present ---
+                        season_match = search(r"Saison (\d+)", episode_text)
+                        if season_match:
+                            current_season = season_match.group(1)
+                        
+                        # --- Extract language and quality from episode title ---
+                        known_languages = ["VF", "VOSTFR", "MULTI"]
+                        
+                        episode_language = "N/A"
+                        episode_quality = "N/A"
+                        
+                        for lang in known_languages:
+                            lang_pattern = rf"- {lang}([^-]*?)(?:- |en téléchargement|$)"
+                            lang_match = search(lang_pattern, episode_text)
+                            if lang_match:
+                                episode_language = lang
+                                quality_part = lang_match.group(1).strip()
+                                if quality_part:
+                                    episode_quality = quality_part
+                                else:
+                                    episode_quality = ""
+                                break
+                        
+                        # --- Update current variables ---
+                        if episode_language != "N/A":
+                            current_page_language = episode_language
+                            current_page_quality = episode_quality
+                
+                # --- Check if download link row ---
+                elif current_episode is not None:
+                    link_node = row.css_first('a[href*="dl-protect."].link')
+                    if link_node:
+                        # --- Extract link information ---
+                        hoster_cell = row.css_first('td[width="120px"].text-center')
+                        hoster_name = hoster_cell.text().strip() if hoster_cell else ""
+                        
+                        # --- Filter supported hosters ---
+                        if hoster_name.lower() not in ["1fichier", "turbobit", "rapidgator"]:
+                            continue
+                        
+                        size_td = row.css_first('td[width="80px"].text-center')
+                        file_size = size_td.text().strip() if size_td else "?"
+                        
+                        url = extract_link_from_node(link_node)
+                        if not url:
+                            continue
+                        
+                        url = format_url(url, WAWACITY_URL)
+                        
+                        # --- Extract filename ---
+                        link_text = link_node.text(strip=True) if link_node else ""
+                        decoded_fn = _extract_filename_from_link(url, link_text)
+                        
+                        # --- Validation ---
+                        if not current_season or not current_episode or not decoded_fn.strip():
+                            logger.error(f"Invalid metadata: S{current_season}E{current_episode}, file: {decoded_fn}")
+                            continue
+                        
+                        page_results.append({
+                            "season": current_season,
+                            "episode": current_episode,
+                            "label": f"S{current_season.zfill(2)}E{current_episode.zfill(2)} - {current_page_quality} - {current_page_language} ({hoster_name.title()})",
+                            "language": current_page_language,
+                            "quality": current_page_quality,
+                            "hoster": hoster_name.title(),
+                            "size": file_size,
+                            "dl_protect": url,
+                            "display_name": decoded_fn
+                        })
+        
+        except Exception as e:
+            logger.error(f"Failed to extract episodes from page: {e}")
+        
+        return page_results
+
+legacy_movie_scraper = LegacyMovieScraper()
+legacy_series_scraper = LegacySeriesScraper()
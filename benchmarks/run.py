@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import httpx
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# --- Isolated SQLite database for the stream formatting cases ---
+os.environ.setdefault("DATABASE_TYPE", "sqlite")
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="wawacity-bench-"), "bench.db"))
+
+# --- Parse on the benchmark thread and never reuse records, so timings measure CPU cost only ---
+os.environ.setdefault("PARSER_POOL_MODE", "inline")
+os.environ.setdefault("PAGE_REVALIDATION_TTL", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wawacity.core.config import WAWACITY_URL
+from wawacity.scrapers.base import BaseScraper, PageContext
+from wawacity.scrapers.movie import MovieScraper, movie_scraper
+from wawacity.scrapers.series import SeriesScraper, series_scraper
+from wawacity.services.stream import stream_service
+from wawacity.utils.cache import encode_results, decode_results
+from wawacity.utils.database import setup_database, teardown_database
+from wawacity.utils.helpers import encode_config_to_base64
+from wawacity.utils.logger import logger
+from benchmarks import synthetic
+from benchmarks.legacy import legacy_movie_scraper, legacy_series_scraper
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+CONFIG = {"alldebrid": "benchmark-key", "tmdb": "benchmark-key", "excluded_words": []}
+B64CONFIG = encode_config_to_base64(CONFIG)
+EXCLUDED_WORDS = ["vostfr", "nitroflare", "hdlight"]
+
+# --- Offline page source ---
+class FixtureContext(PageContext):
+
+    def __init__(self, pages: Dict[str, str]):
+        super().__init__()
+        self._html = pages
+
+    async def _fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[httpx.Response]:
+        html = self._html.get(url)
+        return httpx.Response(200, text=html) if html is not None else None
+
+# --- Benchmark case ---
+class Case:
+
+    def __init__(self, name: str, pages: int, run: Callable[[], Awaitable[int]]):
+        self.name = name
+        self.pages = pages
+        self.run = run
+
+# --- Scraper cases ---
+def _movie_case(name: str, html: str, scraper: MovieScraper = movie_scraper) -> Case:
+    page_path = "?p=film&id=1-benchmark"
+    pages = {f"{WAWACITY_URL}/{page_path}": html}
+    quality_data = {"quality": "1080p", "language": "MULTI", "page_path": page_path}
+
+    async def run() -> int:
+        results = await scraper._extract_links_for_quality(quality_data, FixtureContext(pages))
+        return len(results)
+
+    return Case(name, 1, run)
+
+async def _extract_series(series_pages: List, context: PageContext, scraper: SeriesScraper = series_scraper) -> List[Dict]:
+    results = []
+    for data, _ in series_pages:
+        results.extend(await scraper._extract_episodes_from_page(data, context))
+    return results
+
+def _series_case(name: str, series_pages: List, scraper: SeriesScraper = series_scraper) -> Case:
+    pages = {f"{WAWACITY_URL}/{data['page_path']}": html for data, html in series_pages}
+
+    async def run() -> int:
+        return len(await _extract_series(series_pages, FixtureContext(pages), scraper))
+
+    return Case(name, len(series_pages), run)
+
+# --- Stream pipeline cases ---
+def _pipeline_cases(results: List[Dict]) -> List[Case]:
+    streams = []
+
+    async def sort_results() -> int:
+        sorted(results, key=BaseScraper.quality_sort_key)
+        return len(results)
+
+    async def format_streams() -> int:
+        streams[:], _ = await stream_service._format_streams(results, B64CONFIG, "http://localhost:7000", None, None, "2024")
+        return len(streams)
+
+    async def filter_streams() -> int:
+        return len(stream_service._filter_excluded_words(streams, EXCLUDED_WORDS))
+
+    async def render_streams() -> int:
+        stream_service._render_streams(streams)
+        return len(streams)
+
+    return [
+        Case("quality_sort_key (20x5x30)", 0, sort_results),
+        Case("_format_streams (20x5x30)", 0, format_streams),
+        Case("_filter_excluded_words (20x5x30)", 0, filter_streams),
+        Case("_render_streams (20x5x30)", 0, render_streams),
+    ]
+
+# --- Cache encoding cases (results column reports stored bytes for encoders) ---
+def _cache_cases(results: List[Dict]) -> List[Case]:
+    cases = []
+    legacy_content = json.dumps(results)
+
+    async def legacy_encode() -> int:
+        return len(json.dumps(results))
+
+    async def legacy_decode() -> int:
+        return len(json.loads(legacy_content))
+
+    cases.append(Case("cache encode json.dumps (20x5x30)", 0, legacy_encode))
+    cases.append(Case("cache decode json.loads (20x5x30)", 0, legacy_decode))
+
+    for encoding in ("json", "compact"):
+        content, _ = encode_results(results, encoding)
+
+        async def encode(encoding: str = encoding) -> int:
+            return len(encode_results(results, encoding)[0])
+
+        async def decode(content: str = content) -> int:
+            return len(decode_results(content)[0])
+
+        cases.append(Case(f"cache encode {encoding} (20x5x30)", 0, encode))
+        cases.append(Case(f"cache decode {encoding} (20x5x30)", 0, decode))
+    return cases
+
+async def build_cases() -> List[Case]:
+    cases = [
+        _movie_case("movie links (fixture)", (FIXTURES_DIR / "movie.html").read_text(encoding="utf-8")),
+        _series_case("series episodes (fixture)", [(
+            {"quality": "1080p", "language": "VF", "page_path": "?p=serie&id=1-benchmark"},
+            (FIXTURES_DIR / "series.html").read_text(encoding="utf-8")
+        )]),
+    ]
+
+    # --- Growth with page size ---
+    for links in (10, 100, 1000):
+        cases.append(_movie_case(f"movie links ({links} rows)", synthetic.movie_page(links)))
+    for episodes in (10, 30, 100, 300):
+        cases.append(_series_case(f"series episodes ({episodes} episodes)", synthetic.series_pages(1, 1, episodes)))
+
+    # --- Whole series: 20 seasons x 5 qualities x 30 episodes ---
+    full_series = synthetic.series_pages(20, 5, 30)
+    cases.append(_series_case("series episodes (20x5x30)", full_series))
+
+    # --- Per-row selector baseline ---
+    cases.append(_movie_case("legacy movie links (1000 rows)", synthetic.movie_page(1000), legacy_movie_scraper))
+    cases.append(_series_case("legacy series episodes (300 episodes)", synthetic.series_pages(1, 1, 300), legacy_series_scraper))
+    cases.append(_series_case("legacy series episodes (20x5x30)", full_series, legacy_series_scraper))
+
+    pages = {f"{WAWACITY_URL}/{data['page_path']}": html for data, html in full_series}
+    results = await _extract_series(full_series, FixtureContext(pages))
+    cases.extend(_pipeline_cases(results))
+    cases.extend(_cache_cases(results))
+    return cases
+
+# --- Regression checks, run before timing: a failing check aborts the benchmark ---
+class Check:
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[Optional[str]]]):
+        self.name = name
+        self.run = run
+
+# --- Single-pass extraction must return exactly what the per-row selector code returned ---
+def _equivalence_checks() -> List[Check]:
+    checks = []
+    movie_pages = [
+        ("movie fixture", (FIXTURES_DIR / "movie.html").read_text(encoding="utf-8")),
+        ("movie 100 rows", synthetic.movie_page(100)),
+        ("movie edge rows", synthetic.movie_edge_page()),
+    ]
+    series_pages = [
+        ("series fixture", [(
+            {"quality": "1080p", "language": "VF", "page_path": "?p=serie&id=1-benchmark"},
+            (FIXTURES_DIR / "series.html").read_text(encoding="utf-8")
+        )]),
+        ("series 3x5x10", synthetic.series_pages(3, 5, 10)),
+    ]
+
+    for name, html in movie_pages:
+        page_path = "?p=film&id=1-benchmark"
+        pages = {f"{WAWACITY_URL}/{page_path}": html}
+        quality_data = {"quality": "1080p", "language": "MULTI", "page_path": page_path}
+
+        async def movie_check(pages: Dict[str, str] = pages, quality_data: Dict = quality_data) -> Optional[str]:
+            results = await movie_scraper._extract_links_for_quality(quality_data, FixtureContext(pages))
+            expected = await legacy_movie_scraper._extract_links_for_quality(quality_data, FixtureContext(pages))
+            return None if results == expected else f"{len(results)} results, legacy returned {len(expected)}"
+
+        checks.append(Check(f"legacy equivalence: {name}", movie_check))
+
+    for name, series in series_pages:
+        pages = {f"{WAWACITY_URL}/{data['page_path']}": html for data, html in series}
+
+        async def series_check(series: List = series, pages: Dict[str, str] = pages) -> Optional[str]:
+            results = await _extract_series(series, FixtureContext(pages))
+            expected = await _extract_series(series, FixtureContext(pages), legacy_series_scraper)
+            return None if results == expected else f"{len(results)} results, legacy returned {len(expected)}"
+
+        checks.append(Check(f"legacy equivalence: {name}", series_check))
+    return checks
+
+async def run_checks(checks: List[Check]) -> bool:
+    passed = True
+    for check in checks:
+        failure = await check.run()
+        if failure:
+            passed = False
+            print(f"FAIL {check.name}: {failure}")
+    return passed
+
+# --- Measurement ---
+async def measure(case: Case, repeat: int) -> Dict:
+    result_count = await case.run()
+
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        await case.run()
+        timings.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    await case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "name": case.name,
+        "pages": case.pages,
+        "results": result_count,
+        "best_ms": best * 1000,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "ms_per_page": best * 1000 / case.pages if case.pages else None,
+        "results_per_second": result_count / best if best > 0 else None,
+        "peak_kib": peak / 1024,
+    }
+
+# --- Report ---
+def _format_number(value: Optional[float], pattern: str) -> str:
+    return pattern.format(value) if value is not None else "-"
+
+def print_report(reports: List[Dict], baseline: Dict[str, Dict]):
+    header = f"{'case':<40} {'pages':>6} {'results':>8} {'best ms':>10} {'ms/page':>9} {'results/s':>11} {'peak KiB':>9}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+
+    for report in reports:
+        line = (
+            f"{report['name']:<40} {report['pages'] or '-':>6} {report['results']:>8} "
+            f"{report['best_ms']:>10.2f} {_format_number(report['ms_per_page'], '{:.3f}'):>9} "
+            f"{_format_number(report['results_per_second'], '{:,.0f}'):>11} {report['peak_kib']:>9.0f}"
+        )
+        previous = baseline.get(report["name"])
+        if previous:
+            line += f" {report['best_ms'] / previous['best_ms']:>7.2f}x"
+        print(line)
+
+async def main(args: argparse.Namespace):
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    await setup_database()
+
+    try:
+        if not await run_checks(_equivalence_checks()):
+            sys.exit(1)
+        cases = [case for case in await build_cases() if not args.filter or args.filter in case.name]
+        reports = [await measure(case, args.repeat) for case in cases]
+    finally:
+        await teardown_database()
+
+    baseline = {}
+    if args.compare:
+        baseline = {report["name"]: report for report in json.loads(Path(args.compare).read_text())}
+
+    print_report(reports, baseline)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(reports, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline scraper and stream formatting benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (best run is reported)")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--save", help="Write the results to a JSON file")
+    parser.add_argument("--compare", help="Compare against a JSON file written by --save")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+from base64 import b64encode
+from typing import Dict, List, Tuple
+
+# --- Variants found on Wawacity pages ---
+SERIES_VARIANTS: List[Tuple[str, str]] = [
+    ("VF", "1080p"),
+    ("VF", "720p"),
+    ("VOSTFR", "1080p"),
+    ("MULTI", "4K"),
+    ("VF", "HDLight 1080p"),
+]
+SERIES_HOSTERS = ["1fichier", "Turbobit", "Rapidgator", "Nitroflare", "Uptobox"]
+MOVIE_HOSTERS = ["1fichier", "Turbobit", "Rapidgator", "Nitroflare", "Uptobox", "Fikper"]
+
+# --- Shared page chrome ---
+def _page(title: str, body: str) -> str:
+    sidebar = "".join(
+        f'<li><a href="?p=film&id={3000 + i}-sortie-{i}">Sortie {i} [1080p - MULTI]</a></li>'
+        for i in range(15)
+    )
+    return (
+        f'<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8"><title>{title} - Wawacity</title></head><body>'
+        '<header class="wa-header"><nav class="wa-nav"><ul><li><a href="/">Accueil</a></li>'
+        '<li><a href="?p=films">Films</a></li><li><a href="?p=series">Séries</a></li></ul></nav></header>'
+        f'<div class="wa-container"><div class="wa-sub-block">{body}</div></div>'
+        f'<aside class="wa-sidebar"><ul>{sidebar}</ul></aside>'
+        '<footer class="wa-footer"><p>Wawacity - Téléchargement direct</p></footer></body></html>'
+    )
+
+def _encode_filename(filename: str) -> str:
+    return b64encode(filename.encode()).decode()
+
+# --- Series quality page ---
+def series_page(season: int, language: str, quality: str, episodes: int) -> str:
+    rows = []
+    for episode in range(1, episodes + 1):
+        rows.append(
+            f'<tr class="episode-title"><td colspan="3">Synthetic - Saison {season} - Épisode {episode} - '
+            f'{language} {quality} en téléchargement</td></tr>'
+        )
+        filename = f"Synthetic.S{season:02d}E{episode:02d}.{language}.{quality.replace(' ', '.')}.mkv"
+        for hoster in SERIES_HOSTERS:
+            slug = f"s{season}e{episode}{language[:2]}{quality[:2]}{hoster[:3]}".lower().replace(" ", "")
+            rows.append(
+                f'<tr class="link-row"><td><a class="link" href="/dl?u=https://dl-protect.link/{slug}'
+                f'&fn={_encode_filename(filename)}" rel="external nofollow">Lien : {filename}</a></td>'
+                f'<td width="120px" class="text-center">{hoster}</td>'
+                f'<td width="80px" class="text-center">1.2 Go</td></tr>'
+            )
+
+    body = (
+        f'<div class="wa-sub-block-title"><i class="flag"></i>Synthetic - Saison {season}<b>[{quality} - {language}]</b></div>'
+        f'<table id="DDLLinks" class="table">{"".join(rows)}</table>'
+    )
+    return _page(f"Synthetic - Saison {season}", body)
+
+# --- Full series grid (seasons x qualities) ---
+def series_pages(seasons: int, qualities: int, episodes: int) -> List[Tuple[Dict, str]]:
+    pages = []
+    for season in range(1, seasons + 1):
+        for language, quality in SERIES_VARIANTS[:qualities]:
+            page_path = f"?p=serie&id={season}-synthetic-saison{season}-{language.lower()}-{quality.lower().replace(' ', '-')}"
+            series_page_data = {"quality": quality, "language": language, "page_path": page_path}
+            pages.append((series_page_data, series_page(season, language, quality, episodes)))
+    return pages
+
+# --- Movie quality page ---
+def movie_page(links: int) -> str:
+    filename = "Synthetic.2024.MULTi.TRUEFRENCH.1080p.WEB-DL.H264.mkv"
+    rows = ['<tr class="link-row"><th>Lien</th><th>Hébergeur</th><th>Taille</th></tr>']
+    for index in range(links):
+        hoster = MOVIE_HOSTERS[index % len(MOVIE_HOSTERS)]
+        rows.append(
+            f'<tr class="link-row"><td><a class="link" href="https://dl-protect.link/m{index:05d}'
+            f'?fn={_encode_filename(filename)}" rel="external nofollow">Lien {index + 1}: {filename}</a></td>'
+            f'<td width="120px" class="text-center">{hoster}</td>'
+            f'<td width="80px" class="text-center">4.37 Go</td></tr>'
+        )
+
+    body = (
+        '<div class="wa-sub-block-title"><i class="flag"></i>Synthetic [2024]<b>[1080p - MULTI]</b></div>'
+        f'<table id="DDLLinks" class="table">{"".join(rows)}</table>'
+    )
+    return _page("Synthetic", body)
+
+# --- Movie page with rows the link filters must skip or keep ---
+def movie_edge_page() -> str:
+    filename = "Synthetic.2024.MULTi.1080p.WEB-DL.mkv"
+
+    def row(index: int, row_class: str, link_text: str, extra_cell: str = "") -> str:
+        return (
+            f'<tr class="{row_class}"><td><a class="link" href="https://dl-protect.link/e{index}'
+            f'?fn={_encode_filename(filename)}" rel="external nofollow">{link_text}</a></td>'
+            f'<td width="120px" class="text-center">1fichier</td>'
+            f'<td width="80px" class="text-center">2.1 Go</td>{extra_cell}</tr>'
+        )
+
+    rows = [
+        row(0, "link-row", f"Lien 0: {filename}"),  # first row: skipped as the header
+        row(1, "link-row", f"Lien 1: {filename}"),
+        row(2, "", f"Lien 2: {filename}"),  # no link-row class: skipped
+        row(3, "link-row", "Télécharger", "<td>Lien direct</td>"),  # "Lien" outside the link cell: kept
+        row(4, "link-row", "Télécharger"),  # no "Lien" anywhere: skipped
+    ]
+    body = (
+        '<div class="wa-sub-block-title"><i class="flag"></i>Synthetic [2024]<b>[1080p - MULTI]</b></div>'
+        f'<table id="DDLLinks" class="table">{"".join(rows)}</table>'
+    )
+    return _page("Synthetic", body)
@@ -0,0 +1,103 @@
+import socket
+import asyncio
+import httpx
+from typing import Awaitable, Callable, List
+from wawacity.core.config import PROXY_FAILURE_THRESHOLD
+from wawacity.utils.http_client import HTTPClient, ProxyRoute
+from wawacity.utils.retry import CircuitBreaker
+
+# --- Proxy routing failures, against local sockets only ---
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _with_routes(routes: List[ProxyRoute], run: Callable[[HTTPClient], Awaitable[None]]):
+    client = HTTPClient()
+    client.routes = routes
+
+    async def main():
+        try:
+            await run(client)
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+def _ejected(route: ProxyRoute):
+    for _ in range(PROXY_FAILURE_THRESHOLD):
+        route.record_failure(0.0)
+
+# --- Every proxy dead, the untried one ejected: the connection error reaches the caller ---
+def test_all_proxies_ejected():
+    proxy_url = f"http://127.0.0.1:{_closed_port()}"
+    routes = [ProxyRoute(proxy_url, 0, 0), ProxyRoute(proxy_url, 1, 0)]
+    _ejected(routes[1])
+
+    async def run(client: HTTPClient):
+        try:
+            await client.get("http://wawacity.invalid/")
+        except httpx.ConnectError:
+            return
+        raise AssertionError("request succeeded through dead proxies")
+
+    _with_routes(routes, run)
+
+# --- Proxy up, upstream unreachable (CONNECT 502): no failover and no ejection ---
+def test_upstream_unreachable():
+    connections = []
+    routes = []
+
+    async def reply(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connections.append(await reader.readuntil(b"\r\n\r\n"))
+        writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def run(client: HTTPClient):
+        server = await asyncio.start_server(reply, "127.0.0.1", 0)
+        proxy_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        client.routes = routes[:] = [ProxyRoute(proxy_url, 0, 0), ProxyRoute(proxy_url, 1, 0)]
+        async with server:
+            try:
+                await client.get("https://wawacity.invalid/")
+            except httpx.ProxyError:
+                pass
+
+    _with_routes([], run)
+    assert len(connections) == 1
+    assert not any(route.breaker.failures for route in routes)
+
+# --- Probe cancelled while waiting for the proxy slot: the half-open slot is freed ---
+def test_probe_released_on_cancel_while_queued():
+    route = ProxyRoute(f"http://127.0.0.1:{_closed_port()}", 0, 1)
+    _ejected(route)
+    route.breaker.opened_at -= route.breaker.recovery_timeout
+
+    async def run(client: HTTPClient):
+        async with route.slot():
+            task = asyncio.create_task(client.get("http://wawacity.invalid/"))
+            while route.queued == 0:
+                await asyncio.sleep(0)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        assert route.breaker.state == CircuitBreaker.HALF_OPEN
+        assert route.breaker.probes_in_flight == 0
+        assert route.breaker.allow_request()
+
+    _with_routes([route], run)
+
+# --- Health probes leave breakers and routing scores untouched ---
+def test_probe_proxies_records_nothing():
+    route = ProxyRoute(f"http://127.0.0.1:{_closed_port()}", 0, 0)
+
+    async def run(client: HTTPClient):
+        statuses = await client.probe_proxies("http://wawacity.invalid/", 1.0)
+        assert statuses[0]["status"].startswith("unreachable")
+        assert route.requests == 0
+        assert route.breaker.failures == 0
+
+    _with_routes([route], run)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Request, Query, Path
-from fastapi.responses import JSONResponse, RedirectResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, RedirectResponse, FileResponse, HTMLResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from typing import Optional
 
-from wawacity.core.config import ADDON_MANIFEST, WAWACITY_URL, PROXY_URL, CUSTOM_HTML, ADDON_PASSWORD
+from wawacity.core.config import ADDON_MANIFEST, PROXY_URLS, CUSTOM_HTML, ADDON_PASSWORD
 from wawacity.utils.validators import validate_config
 from wawacity.services.stream import stream_service
 from wawacity.services.alldebrid import alldebrid_service
@@ -65,18 +66,16 @@ async def get_streams(
     try:
         base_url = str(request.base_url).rstrip('/')
         
-        streams = await stream_service.get_streams(
+        payload = await stream_service.get_streams(
             content_type=content_type,
             content_id=content_id_formatted,
             config=config,
+            b64config=b64config,
             base_url=base_url
         )
         
-        return JSONResponse(content={
-            "streams": streams,
-            "cacheMaxAge": 1
-        })
-        
+        return Response(content=payload, media_type="application/json")
+    
     except Exception as e:
         logger.error(f"Stream request failed: {e}")
         return JSONResponse(content={"streams": []})
@@ -164,7 +163,9 @@ async def debug_alldebrid(
 async def health_check():
     import time
     from wawacity.utils.http_client import http_client
+    from wawacity.utils.mirrors import mirror_pool
     from wawacity.utils.database import database
+    from wawacity.utils.cache import content_memory_cache, metadata_memory_cache, resolved_memory_cache, stream_memory_cache
     
     start_time = time.time()
     health_status = {
@@ -194,55 +195,79 @@ async def health_check():
         }
         health_status["status"] = "degraded"
     
-    # --- Wawacity test ---
-    wawacity_start = time.time()
-    try:
-        response = await http_client.get(WAWACITY_URL, timeout=5)
-        wawacity_time = round((time.time() - wawacity_start) * 1000)
-        
-        if response.status_code == 200:
-            health_status["checks"]["wawacity"] = {
-                "status": "ok",
-                "message": "Wawacity accessible",
-                "response_time_ms": wawacity_time
-            }
-        else:
-            health_status["checks"]["wawacity"] = {
-                "status": "error",
-                "message": f"Wawacity HTTP {response.status_code}",
-                "response_time_ms": wawacity_time
-            }
-            health_status["status"] = "degraded"
-            
-    except Exception as e:
-        wawacity_time = round((time.time() - wawacity_start) * 1000)
+    # --- Memory cache stats ---
+    health_status["checks"]["memory_cache"] = {
+        "status": "ok",
+        **content_memory_cache.stats()
+    }
+    health_status["checks"]["metadata_cache"] = {
+        "status": "ok",
+        **metadata_memory_cache.stats()
+    }
+    health_status["checks"]["resolved_links_cache"] = {
+        "status": "ok",
+        **resolved_memory_cache.stats()
+    }
+    health_status["checks"]["stream_response_cache"] = {
+        "status": "ok",
+        **stream_memory_cache.stats()
+    }
+    
+    # --- Outbound per-host pools ---
+    health_status["checks"]["http_pools"] = {
+        "status": "ok",
+        "hosts": http_client.stats()
+    }
+    
+    # --- AllDebrid circuit state ---
+    health_status["checks"]["alldebrid"] = {
+        "status": "ok" if alldebrid_service.breaker.state == "closed" else "degraded",
+        **alldebrid_service.breaker.stats()
+    }
+    
+    # --- Wawacity mirrors test ---
+    mirrors = await mirror_pool.probe(timeout=5)
+    available = [mirror for mirror in mirrors if mirror["status"] == "ok"]
+    if available:
+        best = min(available, key=lambda mirror: mirror["response_time_ms"])
+        health_status["checks"]["wawacity"] = {
+            "status": "ok",
+            "message": f"Wawacity accessible ({len(available)}/{len(mirrors)} mirrors)",
+            "response_time_ms": best["response_time_ms"],
+            "preferred_mirror": mirror_pool.ranked()[0].base_url,
+            "mirrors": mirrors
+        }
+        if len(available) < len(mirrors):
+            health_status["checks"]["wawacity"]["status"] = "degraded"
+            if health_status["status"] == "healthy":
+                health_status["status"] = "degraded"
+    else:
         health_status["checks"]["wawacity"] = {
             "status": "error",
-            "message": f"Wawacity unreachable: {str(e)}",
-            "response_time_ms": wawacity_time
+            "message": f"Wawacity unreachable on {len(mirrors)} mirrors",
+            "response_time_ms": max(mirror["response_time_ms"] for mirror in mirrors),
+            "mirrors": mirrors
         }
         health_status["status"] = "unhealthy"
     
-    # --- Proxy test ---
-    if PROXY_URL:
-        try:
-            test_response = await http_client.get("https://httpbin.org/ip", timeout=5)
-            if test_response.status_code == 200:
-                health_status["checks"]["proxy"] = {
-                    "status": "ok",
-                    "message": "Proxy functional"
-                }
-            else:
-                health_status["checks"]["proxy"] = {
-                    "status": "error",
-                    "message": "Proxy not responding"
-                }
-                health_status["status"] = "degraded"
-        except Exception as e:
+    # --- Proxy pool test ---
+    if PROXY_URLS:
+        proxies = await http_client.probe_proxies("https://httpbin.org/ip", timeout=5)
+        available = [proxy for proxy in proxies if proxy["status"] == "ok"]
+        if available:
+            health_status["checks"]["proxy"] = {
+                "status": "ok" if len(available) == len(proxies) else "degraded",
+                "message": f"Proxy functional ({len(available)}/{len(proxies)} proxies)",
+                "preferred_proxy": http_client.ranked_routes()[0].name,
+                "proxies": proxies
+            }
+        else:
             health_status["checks"]["proxy"] = {
                 "status": "error",
-                "message": f"Proxy error: {str(e)}"
+                "message": f"No proxy responding ({len(proxies)} configured)",
+                "proxies": proxies
             }
+        if health_status["checks"]["proxy"]["status"] != "ok" and health_status["status"] == "healthy":
             health_status["status"] = "degraded"
     else:
         health_status["checks"]["proxy"] = {
@@ -256,6 +281,13 @@ async def health_check():
     
     return health_status
 
+# --- Prometheus metrics ---
+@router.get("/metrics", 
+           summary="Métriques", 
+           description="Métriques Prometheus : latence par étape, cache, verrous et requêtes sortantes")
+async def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # --- Password configuration route ---
 @router.get("/password-config", 
            summary="Configuration mot de passe", 
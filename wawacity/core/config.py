@@ -14,16 +14,33 @@ PORT = int(environ.get("PORT", "7000"))
 
 # --- Source configuration ---
 WAWACITY_URL = environ.get("WAWACITY_URL", "https://wawacity.diy")
+WAWACITY_MIRRORS = [
+    url.strip().rstrip("/") for url in environ.get("WAWACITY_MIRRORS", "").split(",") if url.strip()
+]  # Extra Wawacity domains, WAWACITY_URL stays the canonical one
+MIRROR_HEDGE_DELAY = float(environ.get("MIRROR_HEDGE_DELAY", "0.75"))  # Seconds before a slow search is also sent to the next best mirror
+MIRROR_FAILURE_THRESHOLD = int(environ.get("MIRROR_FAILURE_THRESHOLD", "3"))  # Consecutive failures before a mirror is skipped
+MIRROR_RECOVERY_TIMEOUT = int(environ.get("MIRROR_RECOVERY_TIMEOUT", "120"))  # Seconds skipped before probing a mirror again
 
 # --- Database configuration ---
-DATABASE_VERSION = "1.0"
+DATABASE_VERSION = "1.1"
 DATABASE_TYPE = environ.get("DATABASE_TYPE", "sqlite").lower()
 DATABASE_PATH = environ.get("DATABASE_PATH", "/app/data/wawacity-addon.db")
 DATABASE_URL = environ.get("DATABASE_URL", "")
 
 # --- Cache configuration ---
 CONTENT_CACHE_TTL = int(environ.get("CONTENT_CACHE_TTL", "3600"))  # 1 hour - Movies and series
+CONTENT_CACHE_STALE_TTL = int(environ.get("CONTENT_CACHE_STALE_TTL", "3600"))  # 1 hour - Expired content served while refreshing
 DEAD_LINK_TTL = int(environ.get("DEAD_LINK_TTL", "604800"))  # 7 days - Dead links tracking
+METADATA_CACHE_TTL = int(environ.get("METADATA_CACHE_TTL", "2592000"))  # 30 days - IMDB to title/year
+METADATA_STALE_TTL = int(environ.get("METADATA_STALE_TTL", "2592000"))  # 30 days - Stale metadata kept for TMDB outages
+RESOLVED_LINK_TTL = int(environ.get("RESOLVED_LINK_TTL", "3600"))  # 1 hour - AllDebrid direct links per API key
+REDIRECTOR_CACHE_TTL = int(environ.get("REDIRECTOR_CACHE_TTL", "86400"))  # 1 day - dl-protect to hoster links (all users)
+REDIRECTOR_NEGATIVE_TTL = int(environ.get("REDIRECTOR_NEGATIVE_TTL", "600"))  # 10 minutes - Unsupported/unavailable/down links
+MEMORY_CACHE_MAX_ENTRIES = int(environ.get("MEMORY_CACHE_MAX_ENTRIES", "1000"))  # In-process LRU entries, shared by all memory tiers
+MEMORY_CACHE_MAX_BYTES = int(environ.get("MEMORY_CACHE_MAX_BYTES", "67108864"))  # 64 MB - In-process LRU size, shared by all memory tiers
+STREAM_RESPONSE_CACHE_TTL = int(environ.get("STREAM_RESPONSE_CACHE_TTL", "300"))  # 5 minutes - Rendered stream responses per configuration
+PAGE_REVALIDATION_TTL = int(environ.get("PAGE_REVALIDATION_TTL", "86400"))  # 1 day - Wawacity page validators and extracted records (0 = disabled)
+CACHE_ENCODING = environ.get("CACHE_ENCODING", "compact").lower()  # compact (zlib-compressed JSON) or json - Stored result sets
 
 # --- Lock configuration ---
 SCRAPE_LOCK_TTL = int(environ.get("SCRAPE_LOCK_TTL", "300"))  # 5 minutes - Scraping lock duration
@@ -31,9 +48,40 @@ SCRAPE_WAIT_TIMEOUT = int(environ.get("SCRAPE_WAIT_TIMEOUT", "30"))  # 30 second
 
 # --- AllDebrid configuration ---
 ALLDEBRID_MAX_RETRIES = int(environ.get("ALLDEBRID_MAX_RETRIES", "10"))
-RETRY_DELAY_SECONDS = int(environ.get("RETRY_DELAY_SECONDS", "2"))
+RETRY_DELAY_SECONDS = int(environ.get("RETRY_DELAY_SECONDS", "2"))  # Base delay, doubled per attempt with jitter
+ALLDEBRID_MAX_RETRY_DELAY = int(environ.get("ALLDEBRID_MAX_RETRY_DELAY", "10"))  # Backoff and Retry-After cap
+ALLDEBRID_MAX_RETRY_TIME = int(environ.get("ALLDEBRID_MAX_RETRY_TIME", "18"))  # Total backoff budget per link, in seconds
+ALLDEBRID_CIRCUIT_FAILURE_THRESHOLD = int(environ.get("ALLDEBRID_CIRCUIT_FAILURE_THRESHOLD", "5"))
+ALLDEBRID_CIRCUIT_RECOVERY_TIMEOUT = int(environ.get("ALLDEBRID_CIRCUIT_RECOVERY_TIMEOUT", "30"))  # Seconds open before probing
+ALLDEBRID_CIRCUIT_HALF_OPEN_REQUESTS = int(environ.get("ALLDEBRID_CIRCUIT_HALF_OPEN_REQUESTS", "3"))
 ALLDEBRID_API_URL = "https://apislow.alldebrid.com/v4"
 
+# --- Speculative pre-resolution configuration ---
+PRERESOLVE_ENABLED = environ.get("PRERESOLVE_ENABLED", "false").lower() == "true"
+PRERESOLVE_TOP_N = int(environ.get("PRERESOLVE_TOP_N", "3"))  # Top-ranked streams resolved after /stream
+PRERESOLVE_WORKERS = int(environ.get("PRERESOLVE_WORKERS", "2"))  # Concurrent background resolutions
+PRERESOLVE_QUEUE_SIZE = int(environ.get("PRERESOLVE_QUEUE_SIZE", "100"))  # Pending resolutions before dropping
+
+# --- Cache warmer configuration ---
+WARMER_ENABLED = environ.get("WARMER_ENABLED", "true").lower() == "true"
+WARMER_INTERVAL = int(environ.get("WARMER_INTERVAL", "60"))  # 60 seconds - Warming cycle
+WARMER_LEAD_TIME = int(environ.get("WARMER_LEAD_TIME", "300"))  # 5 minutes - Refresh this long before expiry
+WARMER_MIN_HITS = int(environ.get("WARMER_MIN_HITS", "3"))  # Requests needed before a title is kept warm
+WARMER_WINDOW = int(environ.get("WARMER_WINDOW", "86400"))  # 1 day - Titles not requested since are forgotten
+WARMER_MAX_CONCURRENCY = int(environ.get("WARMER_MAX_CONCURRENCY", "2"))  # Concurrent warming scrapes
+WARMER_MAX_PER_MINUTE = int(environ.get("WARMER_MAX_PER_MINUTE", "10"))  # Warming scrapes started per minute
+
+# --- Series scraping configuration ---
+SERIES_TARGETED_SCRAPING = environ.get("SERIES_TARGETED_SCRAPING", "true").lower() == "true"  # Requested season first, other seasons in background
+
+# --- Early response configuration ---
+EARLY_RESPONSE_MIN_PAGES = int(environ.get("EARLY_RESPONSE_MIN_PAGES", "2"))  # Pages with results for the requested content before responding (0 waits for all pages)
+EARLY_RESPONSE_BUDGET = float(environ.get("EARLY_RESPONSE_BUDGET", "3"))  # Seconds after which any partial results are returned
+
+# --- HTML parsing configuration ---
+PARSER_POOL_MODE = environ.get("PARSER_POOL_MODE", "thread").lower()  # thread, process or inline (on the event loop)
+PARSER_POOL_WORKERS = int(environ.get("PARSER_POOL_WORKERS", "2"))  # Parsing threads or processes
+
 # --- TMDB configuration ---
 TMDB_API_URL = "https://api.themoviedb.org/3"
 
@@ -45,6 +93,20 @@ ADDON_PASSWORD = environ.get("ADDON_PASSWORD", "")
 
 # --- Proxy configuration ---
 PROXY_URL = environ.get("PROXY_URL")
+PROXY_URLS = list(dict.fromkeys(
+    url.strip() for url in [PROXY_URL or "", *environ.get("PROXY_URLS", "").split(",")] if url.strip()
+))  # PROXY_URL plus the extra proxies of the pool
+PROXY_MAX_CONCURRENCY = int(environ.get("PROXY_MAX_CONCURRENCY", "16"))  # Concurrent requests per proxy, all hosts included (0 = unlimited)
+PROXY_FAILURE_THRESHOLD = int(environ.get("PROXY_FAILURE_THRESHOLD", "3"))  # Consecutive connection failures before a proxy is ejected
+PROXY_RECOVERY_TIMEOUT = int(environ.get("PROXY_RECOVERY_TIMEOUT", "60"))  # Seconds ejected before a proxy is probed again
+
+# --- Outbound HTTP configuration ---
+HTTP_MAX_CONNECTIONS_PER_HOST = int(environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", "8"))  # Concurrent requests and pooled connections per upstream host and proxy (0 = unlimited)
+HTTP_HOST_LIMITS = {
+    host.strip().lower(): int(limit)
+    for host, limit in (item.split("=", 1) for item in environ.get("HTTP_HOST_LIMITS", "").split(",") if "=" in item)
+}  # Per-host overrides, e.g. "wawacity.diy=6,alldebrid.com=4"
+HTTP2_ENABLED = environ.get("HTTP2_ENABLED", "false").lower() == "true"  # HTTP/2 where the upstream supports it (requires h2)
 
 # --- Internal configuration ---
 CLEANUP_INTERVAL = 60  # 60 seconds cleanup cycle
@@ -10,11 +10,21 @@ from starlette.requests import Request
 from wawacity.api.routes import router
 from wawacity.utils.database import setup_database, teardown_database, cleanup_expired_data
 from wawacity.utils.http_client import http_client
+from wawacity.utils.mirrors import mirror_pool
+from wawacity.services.stream import stream_service
+from wawacity.services.warmer import cache_warmer
+from wawacity.utils.parser_pool import parser_pool
 from wawacity.core.config import (
-    PORT, PROXY_URL, ADDON_NAME, ADDON_ID, ADDON_MANIFEST,
+    PORT, PROXY_URLS, PROXY_MAX_CONCURRENCY, ADDON_NAME, ADDON_ID, ADDON_MANIFEST, HTTP_MAX_CONNECTIONS_PER_HOST, MIRROR_HEDGE_DELAY,
     WAWACITY_URL, DATABASE_TYPE, DATABASE_VERSION, DATABASE_PATH,
     CONTENT_CACHE_TTL, DEAD_LINK_TTL, SCRAPE_LOCK_TTL, SCRAPE_WAIT_TIMEOUT,
-    ALLDEBRID_MAX_RETRIES, RETRY_DELAY_SECONDS, CLEANUP_INTERVAL
+    ALLDEBRID_MAX_RETRIES, RETRY_DELAY_SECONDS, CLEANUP_INTERVAL,
+    MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES, METADATA_CACHE_TTL, STREAM_RESPONSE_CACHE_TTL,
+    CACHE_ENCODING, PAGE_REVALIDATION_TTL,
+    CONTENT_CACHE_STALE_TTL, ALLDEBRID_MAX_RETRY_DELAY, ALLDEBRID_MAX_RETRY_TIME, PRERESOLVE_ENABLED,
+    PRERESOLVE_TOP_N, PRERESOLVE_WORKERS, WARMER_ENABLED, WARMER_MAX_CONCURRENCY,
+    WARMER_MAX_PER_MINUTE, SERIES_TARGETED_SCRAPING, EARLY_RESPONSE_MIN_PAGES,
+    EARLY_RESPONSE_BUDGET
 )
 from wawacity.utils.logger import logger
 
@@ -30,7 +40,7 @@ class LoguruMiddleware(BaseHTTPMiddleware):
         finally:
             process_time = time.time() - start_time
             # --- Log API requests with custom logger ---
-            if request.url.path != "/health":
+            if request.url.path not in ("/health", "/metrics"):
                 logger.log(
                     "API",
                     f"{request.method} {request.url.path} - {response.status_code if 'response' in locals() else '500'} - {process_time:.2f}s",
@@ -41,16 +51,21 @@ class LoguruMiddleware(BaseHTTPMiddleware):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await setup_database()
-    cleanup_task = asyncio.create_task(cleanup_expired_data())
+    background_tasks = [asyncio.create_task(cleanup_expired_data())]
+    if WARMER_ENABLED:
+        background_tasks.append(asyncio.create_task(cache_warmer.run()))
     
     yield
     
-    cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    for task in background_tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
     
+    await stream_service.close()
+    parser_pool.shutdown()
     await http_client.close()
     await teardown_database()
 
@@ -84,15 +99,32 @@ if __name__ == "__main__":
     # --- Startup logs ---
     logger.log("STARTUP", f"Addon: {ADDON_NAME} v{ADDON_MANIFEST['version']} ({ADDON_ID})")
     logger.log("STARTUP", f"Server: http://localhost:{PORT}/")
-    logger.log("STARTUP", f"Source: {WAWACITY_URL}")
+    logger.log("STARTUP", f"Source: {WAWACITY_URL}" + (f" (+{len(mirror_pool.mirrors) - 1} mirrors, hedge after {MIRROR_HEDGE_DELAY}s)" if len(mirror_pool.mirrors) > 1 else ""))
     logger.log("STARTUP", f"Database: {DATABASE_TYPE} v{DATABASE_VERSION}")
-    logger.log("STARTUP", f"Cache TTL: content={CONTENT_CACHE_TTL}s, dead_links={DEAD_LINK_TTL}s")
+    logger.log("STARTUP", f"Cache TTL: content={CONTENT_CACHE_TTL}s (+{CONTENT_CACHE_STALE_TTL}s stale), dead_links={DEAD_LINK_TTL}s, metadata={METADATA_CACHE_TTL}s, streams={STREAM_RESPONSE_CACHE_TTL}s, page_validators={PAGE_REVALIDATION_TTL}s")
+    logger.log("STARTUP", f"Memory cache: {MEMORY_CACHE_MAX_ENTRIES} entries, {MEMORY_CACHE_MAX_BYTES // 1048576} MB across all tiers")
+    logger.log("STARTUP", f"Cache encoding: {CACHE_ENCODING}")
     logger.log("STARTUP", f"Locks: duration={SCRAPE_LOCK_TTL}s, timeout={SCRAPE_WAIT_TIMEOUT}s")
-    logger.log("STARTUP", f"AllDebrid: {ALLDEBRID_MAX_RETRIES} retries, {RETRY_DELAY_SECONDS}s delay")
+    logger.log("STARTUP", f"AllDebrid: {ALLDEBRID_MAX_RETRIES} retries, {RETRY_DELAY_SECONDS}s-{ALLDEBRID_MAX_RETRY_DELAY}s backoff, {ALLDEBRID_MAX_RETRY_TIME}s total")
     logger.log("STARTUP", f"Cleanup: {CLEANUP_INTERVAL}s interval")
+    logger.log("STARTUP", f"Series scraping: {'requested season first' if SERIES_TARGETED_SCRAPING else 'all seasons'}")
+    logger.log("STARTUP", "Early response: " + (f"{EARLY_RESPONSE_MIN_PAGES} pages or {EARLY_RESPONSE_BUDGET}s" if EARLY_RESPONSE_MIN_PAGES > 0 else "disabled"))
+    logger.log("STARTUP", f"HTML parsing: {parser_pool.mode}" + (f" ({parser_pool.workers} workers)" if parser_pool.mode != "inline" else ""))
+    
+    if WARMER_ENABLED:
+        logger.log("STARTUP", f"Cache warmer: {WARMER_MAX_CONCURRENCY} concurrent, {WARMER_MAX_PER_MINUTE}/min")
+    else:
+        logger.log("STARTUP", "Cache warmer: disabled")
+    
+    if PRERESOLVE_ENABLED:
+        logger.log("STARTUP", f"Pre-resolution: top {PRERESOLVE_TOP_N} streams, {PRERESOLVE_WORKERS} workers")
+    else:
+        logger.log("STARTUP", "Pre-resolution: disabled")
+    
+    logger.log("STARTUP", f"HTTP: {HTTP_MAX_CONNECTIONS_PER_HOST or 'unlimited'} connections per host and proxy, HTTP/2 {'enabled' if http_client.http2 else 'disabled'}")
     
-    if PROXY_URL:
-        logger.log("STARTUP", "Proxy: enabled")
+    if PROXY_URLS:
+        logger.log("STARTUP", f"Proxy: {len(PROXY_URLS)} proxies, {PROXY_MAX_CONCURRENCY or 'unlimited'} concurrent requests each")
     else:
         logger.log("STARTUP", "Proxy: disabled")
     
@@ -1,33 +1,111 @@
-from typing import List, Dict, Optional, Any
-from selectolax.parser import HTMLParser, Node
-from re import search
+import asyncio
+import hashlib
+import httpx
+import orjson
+from typing import AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Any, Callable, Tuple
+from time import perf_counter
 from wawacity.utils.http_client import http_client
+from wawacity.utils.mirrors import mirror_pool
+from wawacity.utils.parser_pool import parser_pool
+from wawacity.utils.cache import get_page_validator, set_page_validator
+from wawacity.utils.metrics import CACHE_LOOKUPS, observe_stage
+from wawacity.core.config import PAGE_REVALIDATION_TTL
+from wawacity.utils.logger import logger
 
-class BaseScraper:
+# --- Request-scoped page memo ---
+class PageContext:
     
-    # --- Link extraction ---
-    @staticmethod
-    def extract_link_from_node(node: Node) -> Optional[str]:
-        link = None
-        attributes = node.attributes
+    def __init__(self):
+        self._pages: Dict[str, asyncio.Future] = {}
+    
+    # --- Raw page fetch, conditional when validators are known, Wawacity pages through mirrors ---
+    async def _fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[httpx.Response]:
+        path = mirror_pool.relative_path(url)
+        if path is not None:
+            response = await mirror_pool.get(path, headers, hedge="search=" in path)
+        else:
+            response = await http_client.get(url, headers=headers)
+        if response.status_code != 200 and not (response.status_code == 304 and headers):
+            logger.error(f"Fetch failed: {response.status_code} ({url})")
+            return None
+        return response
+    
+    # --- Single fetch and off-loop parse into plain records ---
+    async def _load(self, url: str, parse: Callable[[str], Any]) -> Optional[Any]:
+        page_key = f"{parse.__name__}|{url}"
+        known = get_page_validator(page_key) if PAGE_REVALIDATION_TTL > 0 else None
+        
+        response = await self._fetch(url, self._conditional_headers(known))
+        if response is None:
+            return None
         
-        if "href" in attributes:
-            link = attributes["href"]
+        # --- Unchanged page: previous records reused without re-parsing ---
+        if response.status_code == 304:
+            CACHE_LOOKUPS.labels("page", "not_modified").inc()
+            content_hash = known["hash"]
+            record = known["record"]
         else:
-            for value in attributes.values():
-                if search(r"^(/|https?:)\w", value):
-                    link = value
-                    break
-        return link
+            content_hash = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+            if known is not None and known["hash"] == content_hash:
+                CACHE_LOOKUPS.labels("page", "unchanged").inc()
+                record = known["record"]
+            else:
+                CACHE_LOOKUPS.labels("page", "changed" if known is not None else "miss").inc()
+                parse_start = perf_counter()
+                record = await parser_pool.run(parse, response.text)
+                observe_stage("parse", parse_start)
+        
+        if PAGE_REVALIDATION_TTL > 0 and record is not None:
+            set_page_validator(page_key, {
+                "etag": response.headers.get("etag") or (known or {}).get("etag"),
+                "last_modified": response.headers.get("last-modified") or (known or {}).get("last_modified"),
+                "hash": content_hash,
+                "record": record,
+                # --- Sized by the parsed record held in memory, not the page ---
+                "size": known["size"] if known is not None and record is known["record"] else len(orjson.dumps(record))
+            }, PAGE_REVALIDATION_TTL)
+        return record
     
-    # --- Node filtering ---
+    # --- Conditional request headers from stored validators ---
     @staticmethod
-    def filter_nodes(nodes: List[Node], pattern: str) -> List[Node]:
-        filtered = []
-        for node in nodes:
-            if isinstance(node, Node) and search(pattern, node.text()):
-                filtered.append(node)
-        return filtered
+    def _conditional_headers(known: Optional[Dict]) -> Optional[Dict[str, str]]:
+        if known is None:
+            return None
+        
+        headers = {}
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+        return headers or None
+    
+    # --- Parsed page retrieval ---
+    async def get(self, url: str, parse: Callable[[str], Any]) -> Optional[Any]:
+        if url not in self._pages:
+            self._pages[url] = asyncio.ensure_future(self._load(url, parse))
+        return await self._pages[url]
+
+class BaseScraper:
+    
+    # --- Page tasks yielded as (page index, results) in completion order ---
+    @staticmethod
+    async def iter_pages(pages: Iterable[Awaitable[List[Dict]]]) -> AsyncIterator[Tuple[int, List[Dict]]]:
+        tasks = [asyncio.ensure_future(page) for page in pages]
+        indexes = {task: index for index, task in enumerate(tasks)}
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=indexes.get):
+                    if task.exception() is not None:
+                        logger.error(f"Page extraction failed: {task.exception()}")
+                        yield indexes[task], []
+                    else:
+                        yield indexes[task], task.result()
+        finally:
+            for task in pending:
+                task.cancel()
     
     # --- Quality sorting ---
     @staticmethod
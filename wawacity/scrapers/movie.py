@@ -1,49 +1,56 @@
-import asyncio
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from re import findall
-from wawacity.scrapers.base import BaseScraper
+from time import perf_counter
+from wawacity.scrapers.base import BaseScraper, PageContext
+from wawacity.scrapers.parsing import parse_movie_search, parse_movie_page
 from wawacity.core.config import WAWACITY_URL
-from wawacity.utils.http_client import http_client
 from wawacity.utils.helpers import format_url, quote_url_param
+from wawacity.utils.metrics import observe_stage
+from wawacity.utils.progress import ScrapeProgress
 from wawacity.utils.logger import logger
-from selectolax.parser import HTMLParser
 
 class MovieScraper(BaseScraper):
     
     # --- Main search entry point ---
     async def search(self, title: str, year: Optional[str] = None) -> List[Dict]:
+        results = await ScrapeProgress().consume(self.iter_search(title, year))
+        return self.sort_results(results)
+    
+    # --- Incremental search: (page index, links) as each quality page completes ---
+    async def iter_search(self, title: str, year: Optional[str] = None) -> AsyncIterator[Tuple[int, List[Dict]]]:
+        context = PageContext()
+        
         try:
             # --- Search for movie ---
-            search_result = await self._search_movie(title, year)
+            stage_start = perf_counter()
+            search_result = await self._search_movie(title, year, context)
+            observe_stage("search_page", stage_start)
             if not search_result:
-                return []
+                return
             
             # --- Extract available qualities ---
-            qualities_data = await self._extract_qualities(search_result)
-            
-            # --- Extract links for each quality in parallel ---
-            tasks = [self._extract_links_for_quality(quality) for quality in qualities_data]
-            results_lists = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # --- Merge all results ---
-            all_results = []
-            for result in results_lists:
-                if isinstance(result, list):
-                    all_results.extend(result)
-                elif not isinstance(result, Exception):
-                    logger.error(f"Unexpected result type: {type(result)}")
-            
-            # --- Sort by quality ---
-            all_results.sort(key=self.quality_sort_key)
-            
-            return all_results
-            
+            stage_start = perf_counter()
+            qualities_data = await self._extract_qualities(search_result, context)
+            
+            # --- Extract links for each quality in parallel, yielded as they complete ---
+            tasks = [
+                self._extract_links_for_quality(quality, context) 
+                for quality in qualities_data
+            ]
+            async for index, results in self.iter_pages(tasks):
+                yield index, results
+            observe_stage("quality_pages", stage_start)
+        
         except Exception as e:
             logger.error(f"Movie search failed for '{title}': {e}")
-            return []
+    
+    # --- Sort by quality ---
+    def sort_results(self, results: List[Dict]) -> List[Dict]:
+        results.sort(key=self.quality_sort_key)
+        return results
     
     # --- Initial movie search ---
-    async def _search_movie(self, title: str, year: Optional[str] = None) -> Optional[Dict]:
+    async def _search_movie(self, title: str, year: Optional[str], context: PageContext) -> Optional[Dict]:
         encoded_title = quote_url_param(str(title)[:31])
         search_url = f"{WAWACITY_URL}/?p=films&search={encoded_title}"
         if year:
@@ -53,31 +60,25 @@ class MovieScraper(BaseScraper):
         
         try:
             # --- Step 1: Find movie link ---
-            response = await http_client.get(search_url)
-            if response.status_code != 200:
-                logger.error(f"Search failed: {response.status_code}")
+            search_links = await context.get(search_url, parse_movie_search)
+            if search_links is None:
                 return None
             
-            parser = HTMLParser(response.text)
-            search_nodes = parser.css('a[href^="?p=film&id="]')
-            
-            if not search_nodes:
+            if not search_links:
                 logger.error(f"No movie links found for '{title}'")
                 return None
             
-            first_link = search_nodes[0].attributes.get("href", "")
+            first_link = search_links[0]
             
             # --- Step 2: Get movie title from page ---
             movie_url = f"{WAWACITY_URL}/{first_link}"
-            response2 = await http_client.get(movie_url)
-            if response2.status_code != 200:
+            movie_page = await context.get(movie_url, parse_movie_page)
+            if not movie_page:
                 return None
             
-            parser2 = HTMLParser(response2.text)
-            title_nodes = parser2.css('div.wa-sub-block-title:has(i.flag)')
+            page_title = movie_page["title"]
             
-            if title_nodes:
-                page_title = title_nodes[0].text(strip=True, separator="|")
+            if page_title is not None:
                 if not page_title.strip():
                     logger.error(f"Empty title found for {title}")
                     return None
@@ -91,13 +92,13 @@ class MovieScraper(BaseScraper):
                     "link": first_link,
                     "text": f"{title} [{year}]" if year else title
                 }
-            
+        
         except Exception as e:
             logger.error(f"Failed to search movie: {e}")
             return None
     
     # --- Extract available qualities ---
-    async def _extract_qualities(self, search_result: Dict) -> List[Dict]:
+    async def _extract_qualities(self, search_result: Dict, context: PageContext) -> List[Dict]:
         qualities_data = []
         page_link = search_result["link"]
         node_text = search_result["text"]
@@ -125,13 +126,10 @@ class MovieScraper(BaseScraper):
         movie_url = f"{WAWACITY_URL}/{page_link}"
         
         try:
-            response = await http_client.get(movie_url)
-            if response.status_code == 200:
-                parser = HTMLParser(response.text)
-                quality_nodes = parser.css('a[href^="?p=film&id="]:has(button)')
-                
-                for node in quality_nodes:
-                    label_raw = node.text().strip()
+            movie_page = await context.get(movie_url, parse_movie_page)
+            if movie_page:
+                for quality_node in movie_page["qualities"]:
+                    label_raw = quality_node["label"]
                     items = findall(r"([\w\- ]+)(?!\()", label_raw)
                     
                     quality_txt = items[0].strip() if items else label_raw.strip()
@@ -146,7 +144,7 @@ class MovieScraper(BaseScraper):
                     qualities_data.append({
                         "quality": quality_txt,
                         "language": language_txt,
-                        "page_path": node.attributes.get("href", "")
+                        "page_path": quality_node["page_path"]
                     })
         except Exception as e:
             logger.error(f"Failed to extract qualities: {e}")
@@ -154,7 +152,7 @@ class MovieScraper(BaseScraper):
         return qualities_data
     
     # --- Extract links for specific quality ---
-    async def _extract_links_for_quality(self, quality_data: Dict) -> List[Dict]:
+    async def _extract_links_for_quality(self, quality_data: Dict, context: PageContext) -> List[Dict]:
         results = []
         page_path = quality_data.get("page_path", "")
         quality_txt = quality_data.get("quality", "?")
@@ -166,60 +164,39 @@ class MovieScraper(BaseScraper):
         movie_page_url = f"{WAWACITY_URL}/{page_path}"
         
         try:
-            response = await http_client.get(movie_page_url)
-            if response.status_code != 200:
+            movie_page = await context.get(movie_page_url, parse_movie_page)
+            if not movie_page:
                 return results
             
-            parser = HTMLParser(response.text)
-            link_rows = parser.css('#DDLLinks tr.link-row:nth-child(n+2)')
+            link_rows = [row for row in movie_page["rows"] if row["type"] == "link" and row["link_row"]]
             
             if not link_rows:
                 logger.log("SCRAPER", f"No links for quality '{quality_txt} ({language_txt})'")
                 return results
             
-            # --- Filter rows with "Lien" ---
-            filtered_rows = self.filter_nodes(link_rows, r"Lien .*")
-            if not filtered_rows:
-                return results
-            
             all_links = []
             primary_metadata = None
             
-            # --- Extract links ---
-            for row in filtered_rows:
-                hoster_cell = row.css_first('td[width="120px"].text-center')
-                hoster_name = hoster_cell.text().strip() if hoster_cell else ""
-                
-                # --- Filter supported hosters ---
-                if hoster_name.lower() not in ["1fichier", "turbobit", "rapidgator"]:
-                    continue
-                
-                size_td = row.css_first('td[width="80px"].text-center')
-                file_size = size_td.text().strip() if size_td else "?"
-                
-                link_node = row.css_first('a[href*="dl-protect."].link')
-                if not link_node:
-                    continue
-                
-                url = self.extract_link_from_node(link_node)
-                if not url:
+            # --- Extract links from rows with "Lien" ---
+            for row in link_rows:
+                if "Lien " not in row["row_text"]:
                     continue
                 
-                url = format_url(url, WAWACITY_URL)
+                url = format_url(row["url"], WAWACITY_URL)
                 
                 # --- Extract filename ---
-                link_text = link_node.text(strip=True) if link_node else ""
+                link_text = row["link_text"]
                 original_filename = link_text.split(":")[-1].strip() if ":" in link_text else ""
                 
                 all_links.append({
-                    "hoster": hoster_name.lower(),
+                    "hoster": row["hoster"],
                     "url": url
                 })
                 
                 # --- Save primary metadata ---
                 if not primary_metadata:
                     primary_metadata = {
-                        "size": file_size,
+                        "size": row["size"],
                         "display_name": original_filename
                     }
             
@@ -235,7 +212,7 @@ class MovieScraper(BaseScraper):
                     "dl_protect": link_data["url"],
                     "display_name": primary_metadata.get("display_name", "?") if primary_metadata else "?"
                 })
-            
+        
         except Exception as e:
             logger.error(f"Failed to extract links for quality '{quality_txt}': {e}")
         
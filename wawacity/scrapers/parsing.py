@@ -0,0 +1,146 @@
+from re import compile
+from typing import List, Dict, Optional, Any
+from selectolax.parser import HTMLParser, Node
+
+# --- Precompiled patterns and selectors ---
+LINK_VALUE_PATTERN = compile(r"^(/|https?:)\w")
+TITLE_SELECTOR = "div.wa-sub-block-title:has(i.flag)"
+DDL_ROW_SELECTOR = "#DDLLinks tr"
+DDL_LINK_SELECTOR = 'a[href*="dl-protect."].link'
+MOVIE_QUALITY_SELECTOR = 'a[href^="?p=film&id="]:has(button)'
+SERIES_LINK_SELECTOR = 'ul.wa-post-list-ofLinks a[href^="?p=serie&id="]'
+SUPPORTED_HOSTERS = frozenset(("1fichier", "turbobit", "rapidgator"))
+
+# --- Link extraction ---
+def extract_link_from_node(node: Node) -> Optional[str]:
+    link = None
+    attributes = node.attributes
+    
+    if "href" in attributes:
+        link = attributes["href"]
+    else:
+        for value in attributes.values():
+            if value and LINK_VALUE_PATTERN.search(value):
+                link = value
+                break
+    return link
+
+# --- dl-protect anchor lookup, direct children first ---
+def _find_ddl_anchor(cell: Node) -> Optional[Node]:
+    for child in cell.iter():
+        if child.tag != "a":
+            continue
+        attributes = child.attributes
+        if "dl-protect." in (attributes.get("href") or "") and "link" in (attributes.get("class") or "").split():
+            return child
+    return cell.css_first(DDL_LINK_SELECTOR)
+
+# --- Element sibling before a row (nth-child(n+2) without a second selector pass) ---
+def _has_previous_element(node: Node) -> bool:
+    sibling = node.prev
+    while sibling is not None:
+        if sibling.tag not in ("-text", "_comment"):
+            return True
+        sibling = sibling.prev
+    return False
+
+# --- Single-pass DDLLinks walker ---
+def walk_ddl_table(parser: HTMLParser) -> List[Dict[str, Any]]:
+    rows = []
+    
+    for row in parser.css(DDL_ROW_SELECTOR):
+        row_class = row.attributes.get("class") or ""
+        if "episode-title" in row_class:
+            rows.append({"type": "episode", "text": row.text(strip=True)})
+            continue
+        
+        hoster_name = None
+        file_size = None
+        link_node = None
+        
+        # --- Direct child cells: link, hoster, size ---
+        for cell in row.iter():
+            if cell.tag != "td":
+                continue
+            attributes = cell.attributes
+            width = attributes.get("width")
+            if width in ("120px", "80px") and "text-center" in (attributes.get("class") or "").split():
+                if width == "120px":
+                    if hoster_name is None:
+                        hoster_name = cell.text().strip()
+                elif file_size is None:
+                    file_size = cell.text().strip()
+            elif link_node is None:
+                link_node = _find_ddl_anchor(cell)
+        
+        # --- Keep supported hosters only ---
+        if link_node is None or not hoster_name or hoster_name.lower() not in SUPPORTED_HOSTERS:
+            continue
+        
+        url = extract_link_from_node(link_node)
+        if not url:
+            continue
+        
+        rows.append({
+            "type": "link",
+            "hoster": hoster_name.lower(),
+            "size": file_size if file_size is not None else "?",
+            "url": url,
+            "link_text": link_node.text(strip=True),
+            "row_text": row.text(),
+            "link_row": "link-row" in row_class.split() and _has_previous_element(row)
+        })
+    
+    return rows
+
+# --- Page title ---
+def _page_title(parser: HTMLParser) -> Optional[str]:
+    title_nodes = parser.css(TITLE_SELECTOR)
+    if not title_nodes:
+        return None
+    return title_nodes[0].text(strip=True, separator="|")
+
+# --- Search result pages (parse functions stay module-level for process pools) ---
+def _parse_search(html: str, link_prefix: str) -> List[str]:
+    parser = HTMLParser(html)
+    return [node.attributes.get("href", "") for node in parser.css(f'a[href^="{link_prefix}"]')]
+
+def parse_movie_search(html: str) -> List[str]:
+    return _parse_search(html, "?p=film&id=")
+
+def parse_series_search(html: str) -> List[str]:
+    return _parse_search(html, "?p=serie&id=")
+
+# --- Movie page: title, other qualities and links ---
+def parse_movie_page(html: str) -> Dict:
+    parser = HTMLParser(html)
+    return {
+        "title": _page_title(parser),
+        "qualities": [
+            {"label": node.text().strip(), "page_path": node.attributes.get("href", "")}
+            for node in parser.css(MOVIE_QUALITY_SELECTOR)
+        ],
+        "rows": walk_ddl_table(parser)
+    }
+
+# --- Series page: title, other seasons, other qualities and episodes ---
+def parse_series_page(html: str) -> Dict:
+    parser = HTMLParser(html)
+    
+    qualities = []
+    for node in parser.css(f"{SERIES_LINK_SELECTOR}:has(button)"):
+        button_node = node.css_first("button")
+        qualities.append({
+            "page_path": node.attributes.get("href", ""),
+            "button": button_node.text(strip=True) if button_node else None
+        })
+    
+    return {
+        "title": _page_title(parser),
+        "seasons": [
+            {"page_path": node.attributes.get("href", ""), "text": node.text(strip=True)}
+            for node in parser.css(SERIES_LINK_SELECTOR)
+        ],
+        "qualities": qualities,
+        "rows": walk_ddl_table(parser)
+    }
@@ -1,41 +1,69 @@
-import asyncio
-from typing import List, Dict, Optional
-from re import findall, search as re_search
-from wawacity.scrapers.base import BaseScraper
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from re import findall, compile
+from time import perf_counter
+from wawacity.scrapers.base import BaseScraper, PageContext
+from wawacity.scrapers.parsing import parse_series_search, parse_series_page
 from wawacity.core.config import WAWACITY_URL
-from wawacity.utils.http_client import http_client
 from wawacity.utils.helpers import extract_filename_from_link, format_url, quote_url_param
+from wawacity.utils.metrics import observe_stage
+from wawacity.utils.progress import ScrapeProgress
 from wawacity.utils.logger import logger
-from selectolax.parser import HTMLParser
+
+# --- Precompiled episode title patterns ---
+EPISODE_PATTERN = compile(r"Épisode (\d+)")
+SEASON_PATTERN = compile(r"Saison (\d+)")
+SEASON_LINK_PATTERN = compile(r"saison-?(\d+)")
+LANGUAGE_PATTERNS = [
+    (lang, compile(rf"- {lang}([^-]*?)(?:- |en téléchargement|$)"))
+    for lang in ("VF", "VOSTFR", "MULTI")
+]
 
 class SeriesScraper(BaseScraper):
     
     # --- Main search entry point ---
-    async def search(self, title: str, year: Optional[str] = None) -> List[Dict]:
+    async def search(self, title: str, year: Optional[str] = None, season: Optional[str] = None, 
+                    context: Optional[PageContext] = None) -> List[Dict]:
+        results = await ScrapeProgress().consume(self.iter_search(title, year, season, context))
+        return self.sort_results(results)
+    
+    # --- Incremental search: (page index, episodes) as each page completes ---
+    async def iter_search(self, title: str, year: Optional[str] = None, season: Optional[str] = None, 
+                         context: Optional[PageContext] = None) -> AsyncIterator[Tuple[int, List[Dict]]]:
+        context = context or PageContext()
+        
         try:
             # --- Search for series ---
-            search_result = await self._search_series(title, year)
+            stage_start = perf_counter()
+            search_result = await self._search_series(title, year, context)
+            observe_stage("search_page", stage_start)
             if not search_result:
-                return []
-            
-            # --- Extract all episodes ---
-            all_episodes = await self._extract_all_episodes(search_result)
-            
-            # --- Sort by season then episode ---
-            all_episodes.sort(key=lambda x: (
-                int(x.get("season", "0")),
-                int(x.get("episode", "0")),
-                self.quality_sort_key(x)
-            ))
-            
-            return all_episodes
+                return
             
+            # --- Extract all episodes, yielded page by page ---
+            stage_start = perf_counter()
+            series_pages = await self._list_series_pages(search_result, context, season)
+            tasks = [
+                self._extract_episodes_from_page(series_page, context) 
+                for series_page in series_pages
+            ]
+            async for index, results in self.iter_pages(tasks):
+                yield index, results
+            observe_stage("quality_pages", stage_start)
+        
         except Exception as e:
             logger.error(f"Series search failed for '{title}': {e}")
-            return []
+    
+    # --- Sort by season then episode ---
+    def sort_results(self, results: List[Dict]) -> List[Dict]:
+        results.sort(key=lambda x: (
+            int(x.get("season", "0")),
+            int(x.get("episode", "0")),
+            self.quality_sort_key(x)
+        ))
+        return results
     
     # --- Initial series search ---
-    async def _search_series(self, title: str, year: Optional[str] = None) -> Optional[Dict]:
+    async def _search_series(self, title: str, year: Optional[str], context: PageContext) -> Optional[Dict]:
         encoded_title = quote_url_param(str(title)[:31])
         search_url = f"{WAWACITY_URL}/?p=series&search={encoded_title}"
         if year:
@@ -45,31 +73,25 @@ class SeriesScraper(BaseScraper):
         
         try:
             # --- Step 1: Find series link ---
-            response = await http_client.get(search_url)
-            if response.status_code != 200:
-                logger.error(f"Search failed: {response.status_code}")
+            search_links = await context.get(search_url, parse_series_search)
+            if search_links is None:
                 return None
             
-            parser = HTMLParser(response.text)
-            search_nodes = parser.css('a[href^="?p=serie&id="]')
-            
-            if not search_nodes:
+            if not search_links:
                 logger.error(f"No series links found for '{title}'")
                 return None
             
-            first_link = search_nodes[0].attributes.get("href", "")
+            first_link = search_links[0]
             
             # --- Step 2: Get series title from page ---
             series_url = f"{WAWACITY_URL}/{first_link}"
-            response2 = await http_client.get(series_url)
-            if response2.status_code != 200:
+            series_page = await context.get(series_url, parse_series_page)
+            if not series_page:
                 return None
             
-            parser2 = HTMLParser(response2.text)
-            title_nodes = parser2.css('div.wa-sub-block-title:has(i.flag)')
+            page_title = series_page["title"]
             
-            if title_nodes:
-                page_title = title_nodes[0].text(strip=True, separator="|")
+            if page_title is not None:
                 if not page_title.strip():
                     logger.error(f"Empty title found for {title}")
                     return None
@@ -83,20 +105,19 @@ class SeriesScraper(BaseScraper):
                     "link": first_link,
                     "text": f"{title} [{year}]" if year else title
                 }
-            
+        
         except Exception as e:
             logger.error(f"Failed to search series: {e}")
             return None
     
-    # --- Extract all episodes from series ---
-    async def _extract_all_episodes(self, search_result: Dict) -> List[Dict]:
-        all_results = []
+    # --- List every season and quality page of a series ---
+    async def _list_series_pages(self, search_result: Dict, context: PageContext, 
+                                season: Optional[str] = None) -> List[Dict]:
+        all_series_pages = []
         series_link = search_result["link"]
         series_url = f"{WAWACITY_URL}/{series_link}"
         
         try:
-            all_series_pages = []
-            
             # --- Extract quality/language from first page ---
             page_title = search_result.get("text", "")
             parts = [item for item in page_title.split("|") if item]
@@ -112,24 +133,25 @@ class SeriesScraper(BaseScraper):
             else:
                 first_quality = "N/A"
                 first_language = "N/A"
-                
+            
+            # --- Season of the index page and its quality variants ---
+            index_season = self._season_number(page_title)
+            
             all_series_pages.append({
                 "quality": first_quality,
                 "language": first_language,
-                "page_path": series_link
+                "page_path": series_link,
+                "season": index_season
             })
             
             # --- Get other available pages/qualities ---
-            response = await http_client.get(series_url)
-            if response.status_code == 200:
-                parser = HTMLParser(response.text)
-                
+            series_page = await context.get(series_url, parse_series_page)
+            if series_page:
                 # --- Other seasons ---
-                other_seasons = parser.css('ul.wa-post-list-ofLinks a[href^="?p=serie&id="]')
-                for season_node in other_seasons:
-                    season_link = season_node.attributes.get("href", "")
+                for season_node in series_page["seasons"]:
+                    season_link = season_node["page_path"]
                     if season_link and "saison" in season_link.lower():
-                        season_title = season_node.text(strip=True)
+                        season_title = season_node["text"]
                         if "(" in season_title and ")" in season_title:
                             quality_part = season_title.split("(")[-1].replace(")", "")
                         else:
@@ -138,17 +160,16 @@ class SeriesScraper(BaseScraper):
                         all_series_pages.append({
                             "quality": quality_part,
                             "language": "N/A",
-                            "page_path": season_link
+                            "page_path": season_link,
+                            "season": self._season_number(season_title, season_link)
                         })
                 
                 # --- Other qualities/languages ---
-                other_qualities = parser.css('ul.wa-post-list-ofLinks a[href^="?p=serie&id="]:has(button)')
-                for quality_node in other_qualities:
-                    quality_link = quality_node.attributes.get("href", "")
+                for quality_node in series_page["qualities"]:
+                    quality_link = quality_node["page_path"]
                     if quality_link and "saison" not in quality_link.lower():
-                        button_node = quality_node.css_first('button')
-                        if button_node:
-                            button_text = button_node.text(strip=True)
+                        button_text = quality_node["button"]
+                        if button_text is not None:
                             quality_parts = button_text.replace("<i>", "").replace("</i>", "").strip()
                         else:
                             quality_parts = "N/A"
@@ -156,30 +177,31 @@ class SeriesScraper(BaseScraper):
                         all_series_pages.append({
                             "quality": quality_parts,
                             "language": quality_parts,
-                            "page_path": quality_link
+                            "page_path": quality_link,
+                            "season": index_season
                         })
             
-            # --- Process each page in parallel ---
-            page_tasks = []
-            for series_page in all_series_pages:
-                page_tasks.append(
-                    self._extract_episodes_from_page(series_page)
-                )
-            
-            page_results = await asyncio.gather(*page_tasks, return_exceptions=True)
-            
-            # --- Merge all results ---
-            for result in page_results:
-                if isinstance(result, list):
-                    all_results.extend(result)
-            
+            # --- Targeted mode: requested season and unlabelled pages only ---
+            if season:
+                all_series_pages = [
+                    page for page in all_series_pages 
+                    if page["season"] is None or page["season"] == int(season)
+                ]
+                logger.log("SCRAPER", f"Season {season}: {len(all_series_pages)} pages")
+        
         except Exception as e:
-            logger.error(f"Failed to extract all episodes: {e}")
+            logger.error(f"Failed to list series pages: {e}")
         
-        return all_results
+        return all_series_pages
+    
+    # --- Season number from a page title or season link ---
+    @staticmethod
+    def _season_number(label: str, link: str = "") -> Optional[int]:
+        match = SEASON_PATTERN.search(label) or SEASON_LINK_PATTERN.search(link.lower())
+        return int(match.group(1)) if match else None
     
     # --- Extract episodes from single page ---
-    async def _extract_episodes_from_page(self, series_page: Dict) -> List[Dict]:
+    async def _extract_episodes_from_page(self, series_page: Dict, context: PageContext) -> List[Dict]:
         page_results = []
         page_path = series_page.get("page_path", "")
         default_quality = series_page.get("quality", "N/A")
@@ -191,14 +213,12 @@ class SeriesScraper(BaseScraper):
         series_page_url = f"{WAWACITY_URL}/{page_path}"
         
         try:
-            response = await http_client.get(series_page_url)
-            if response.status_code != 200:
+            parsed_page = await context.get(series_page_url, parse_series_page)
+            if not parsed_page:
                 return page_results
             
-            parser = HTMLParser(response.text)
-            
             # --- Get all rows from DDLLinks table ---
-            link_rows = parser.css('#DDLLinks tr')
+            link_rows = parsed_page["rows"]
             if not link_rows:
                 logger.log("SCRAPER", f"No download links for page: {page_path}")
                 return page_results
@@ -210,84 +230,51 @@ class SeriesScraper(BaseScraper):
             
             for row in link_rows:
                 # --- Check if episode title row ---
-                row_class = str(row.attributes.get("class", ""))
-                if "episode-title" in row_class:
-                    episode_text = row.text(strip=True)
+                if row["type"] == "episode":
+                    episode_text = row["text"]
                     
                     if "Épisode" in episode_text:
                         # --- Extract episode number ---
-                        episode_match = re_search(r"Épisode (\d+)", episode_text)
+                        episode_match = EPISODE_PATTERN.search(episode_text)
                         current_episode = episode_match.group(1) if episode_match else "1"
                         
                         # --- Extract season if present ---
-                        season_match = re_search(r"Saison (\d+)", episode_text)
+                        season_match = SEASON_PATTERN.search(episode_text)
                         if season_match:
                             current_season = season_match.group(1)
                         
                         # --- Extract language and quality from episode title ---
-                        known_languages = ["VF", "VOSTFR", "MULTI"]
-                        
-                        episode_language = "N/A"
-                        episode_quality = "N/A"
-                        
-                        for lang in known_languages:
-                            lang_pattern = rf"- {lang}([^-]*?)(?:- |en téléchargement|$)"
-                            lang_match = re_search(lang_pattern, episode_text)
+                        for lang, lang_pattern in LANGUAGE_PATTERNS:
+                            lang_match = lang_pattern.search(episode_text)
                             if lang_match:
-                                episode_language = lang
-                                quality_part = lang_match.group(1).strip()
-                                if quality_part:
-                                    episode_quality = quality_part
-                                else:
-                                    episode_quality = ""
+                                current_page_language = lang
+                                current_page_quality = lang_match.group(1).strip()
                                 break
-                        
-                        # --- Update current variables ---
-                        if episode_language != "N/A":
-                            current_page_language = episode_language
-                            current_page_quality = episode_quality
                 
                 # --- Check if download link row ---
                 elif current_episode is not None:
-                    link_node = row.css_first('a[href*="dl-protect."].link')
-                    if link_node:
-                        # --- Extract link information ---
-                        hoster_cell = row.css_first('td[width="120px"].text-center')
-                        hoster_name = hoster_cell.text().strip() if hoster_cell else ""
-                        
-                        # --- Filter supported hosters ---
-                        if hoster_name.lower() not in ["1fichier", "turbobit", "rapidgator"]:
-                            continue
-                        
-                        size_td = row.css_first('td[width="80px"].text-center')
-                        file_size = size_td.text().strip() if size_td else "?"
-                        
-                        url = self.extract_link_from_node(link_node)
-                        if not url:
-                            continue
-                        
-                        url = format_url(url, WAWACITY_URL)
-                        
-                        # --- Extract filename ---
-                        link_text = link_node.text(strip=True) if link_node else ""
-                        decoded_fn = extract_filename_from_link(url, link_text)
-                        
-                        # --- Validation ---
-                        if not current_season or not current_episode or not decoded_fn.strip():
-                            logger.error(f"Invalid metadata: S{current_season}E{current_episode}, file: {decoded_fn}")
-                            continue
-                        
-                        page_results.append({
-                            "season": current_season,
-                            "episode": current_episode,
-                            "label": f"S{current_season.zfill(2)}E{current_episode.zfill(2)} - {current_page_quality} - {current_page_language} ({hoster_name.title()})",
-                            "language": current_page_language,
-                            "quality": current_page_quality,
-                            "hoster": hoster_name.title(),
-                            "size": file_size,
-                            "dl_protect": url,
-                            "display_name": decoded_fn
-                        })
+                    url = format_url(row["url"], WAWACITY_URL)
+                    
+                    # --- Extract filename ---
+                    decoded_fn = extract_filename_from_link(url, row["link_text"])
+                    
+                    # --- Validation ---
+                    if not current_season or not current_episode or not decoded_fn.strip():
+                        logger.error(f"Invalid metadata: S{current_season}E{current_episode}, file: {decoded_fn}")
+                        continue
+                    
+                    hoster_name = row["hoster"].title()
+                    page_results.append({
+                        "season": current_season,
+                        "episode": current_episode,
+                        "label": f"S{current_season.zfill(2)}E{current_episode.zfill(2)} - {current_page_quality} - {current_page_language} ({hoster_name})",
+                        "language": current_page_language,
+                        "quality": current_page_quality,
+                        "hoster": hoster_name,
+                        "size": row["size"],
+                        "dl_protect": url,
+                        "display_name": decoded_fn
+                    })
         
         except Exception as e:
             logger.error(f"Failed to extract episodes from page: {e}")
@@ -1,11 +1,75 @@
-from typing import Optional
+from typing import Optional, Dict, Tuple
 from asyncio import sleep
+import httpx
 from wawacity.utils.http_client import http_client
-from wawacity.core.config import ALLDEBRID_API_URL, ALLDEBRID_MAX_RETRIES, RETRY_DELAY_SECONDS
+from wawacity.utils.database import database
+from wawacity.utils.cache import get_redirector_cache, set_redirector_cache
+from wawacity.utils.retry import RetryPolicy, CircuitBreaker, CircuitBreakerOpen, parse_retry_after
+from wawacity.core.config import (
+    ALLDEBRID_API_URL, ALLDEBRID_MAX_RETRIES, RETRY_DELAY_SECONDS, ALLDEBRID_MAX_RETRY_DELAY, ALLDEBRID_MAX_RETRY_TIME,
+    ALLDEBRID_CIRCUIT_FAILURE_THRESHOLD, ALLDEBRID_CIRCUIT_RECOVERY_TIMEOUT, ALLDEBRID_CIRCUIT_HALF_OPEN_REQUESTS,
+    REDIRECTOR_CACHE_TTL, REDIRECTOR_NEGATIVE_TTL
+)
 from wawacity.utils.logger import logger
 
+# --- Per-link API errors that say nothing about AllDebrid's health ---
+REDIRECTOR_FINAL_ERRORS = ("LINK_HOST_NOT_SUPPORTED", "LINK_HOST_UNAVAILABLE", "LINK_DOWN")
+UNLOCK_FINAL_ERRORS = ("LINK_DOWN",)
+
 class AllDebridService:
     
+    def __init__(self):
+        self.retry_policy = RetryPolicy(ALLDEBRID_MAX_RETRIES, RETRY_DELAY_SECONDS, ALLDEBRID_MAX_RETRY_DELAY, ALLDEBRID_MAX_RETRY_TIME)
+        self.breaker = CircuitBreaker(
+            "alldebrid",
+            ALLDEBRID_CIRCUIT_FAILURE_THRESHOLD,
+            ALLDEBRID_CIRCUIT_RECOVERY_TIMEOUT,
+            ALLDEBRID_CIRCUIT_HALF_OPEN_REQUESTS
+        )
+    
+    # --- API call guarded by the circuit breaker ---
+    async def _request(self, endpoint: str, params: Dict, final_errors: Tuple[str, ...]) -> httpx.Response:
+        if not self.breaker.allow_request():
+            raise CircuitBreakerOpen()
+        
+        try:
+            response = await http_client.get(f"{ALLDEBRID_API_URL}/{endpoint}", params=params)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+        elif response.status_code == 200 and self._is_retriable_error(response, final_errors):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+    
+    @staticmethod
+    def _is_retriable_error(response: httpx.Response, final_errors: Tuple[str, ...]) -> bool:
+        try:
+            data = response.json()
+        except ValueError:
+            return True
+        if data.get("status") == "success":
+            return False
+        return data.get("error", {}).get("code") not in final_errors
+    
+    # --- Cached redirector lookup ---
+    async def _get_cached_redirect(self, dl_protect_link: str) -> Optional[Dict]:
+        try:
+            return await get_redirector_cache(database, dl_protect_link)
+        except Exception as e:
+            logger.error(f"Redirector cache lookup failed: {e}")
+            return None
+    
+    async def _cache_redirect(self, dl_protect_link: str, entry: Dict, ttl: int):
+        try:
+            await set_redirector_cache(database, dl_protect_link, entry, ttl)
+        except Exception as e:
+            logger.error(f"Redirector cache write failed: {e}")
+    
     # --- Link conversion ---
     async def convert_link(self, dl_protect_link: str, apikey: str) -> Optional[str]:
         if not apikey:
@@ -14,52 +78,80 @@ class AllDebridService:
         
         logger.log("ALLDEBRID", f"Converting: {dl_protect_link}")
         
-        for attempt in range(ALLDEBRID_MAX_RETRIES):
+        # --- Shared redirector result, independent of the API key ---
+        redirected_links = []
+        cached_redirect = await self._get_cached_redirect(dl_protect_link)
+        if cached_redirect:
+            error_code = cached_redirect.get("error")
+            if error_code:
+                logger.error(f"Redirector error (cached): {error_code}")
+                return "LINK_DOWN" if error_code == "LINK_DOWN" else None
+            redirected_links = cached_redirect.get("links", [])
+            logger.log("ALLDEBRID", "Redirector result from cache")
+        
+        max_retries = self.retry_policy.max_retries
+        waited = 0.0
+        attempts = 0
+        for attempt in range(max_retries):
+            if self.retry_policy.exhausted(waited):
+                break
+            attempts += 1
             try:
                 # --- Step 1: Resolve redirector ---
-                response1 = await http_client.get(
-                    f"{ALLDEBRID_API_URL}/link/redirector",
-                    params={"agent": "Wawacity", "apikey": apikey, "link": dl_protect_link}
-                )
-                
-                if response1.status_code != 200:
-                    logger.error(f"Redirector failed: {response1.status_code} (attempt {attempt + 1}/{ALLDEBRID_MAX_RETRIES}, retry in {RETRY_DELAY_SECONDS}s)")
-                    await sleep(RETRY_DELAY_SECONDS)
-                    continue
-                
-                data1 = response1.json()
-                if data1.get("status") != "success":
-                    error = data1.get("error", {})
-                    if error.get("code") == "LINK_HOST_NOT_SUPPORTED":
-                        logger.error(f"Redirector error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')}")
-                        return None
-                    elif error.get("code") == "LINK_HOST_UNAVAILABLE":
-                        logger.error(f"Redirector error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')}")
-                        return None
-                    elif error.get("code") == "LINK_DOWN":
-                        logger.error(f"Redirector error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')}")
-                        return "LINK_DOWN"
-                    
-                    logger.error(f"Redirector error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')} (attempt {attempt + 1}/{ALLDEBRID_MAX_RETRIES}, retry in {RETRY_DELAY_SECONDS}s)")
-                    await sleep(RETRY_DELAY_SECONDS)
-                    continue
-                
-                redirected_links = data1.get("data", {}).get("links", [])
                 if not redirected_links:
-                    logger.error(f"No redirected links (attempt {attempt + 1}/{ALLDEBRID_MAX_RETRIES}, retry in {RETRY_DELAY_SECONDS}s)")
-                    await sleep(RETRY_DELAY_SECONDS)
-                    continue
+                    response1 = await self._request(
+                        "link/redirector",
+                        {"agent": "Wawacity", "apikey": apikey, "link": dl_protect_link},
+                        REDIRECTOR_FINAL_ERRORS
+                    )
+                    
+                    if response1.status_code != 200:
+                        retry_after = parse_retry_after(response1)
+                        delay = self.retry_policy.delay(attempt, retry_after, waited)
+                        logger.error(f"Redirector failed: {response1.status_code} (attempt {attempt + 1}/{max_retries}, retry in {delay}s)")
+                        await sleep(delay)
+                        waited += delay
+                        continue
+                    
+                    data1 = response1.json()
+                    if data1.get("status") != "success":
+                        error = data1.get("error", {})
+                        error_code = error.get("code")
+                        if error_code in REDIRECTOR_FINAL_ERRORS:
+                            logger.error(f"Redirector error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')}")
+                            await self._cache_redirect(dl_protect_link, {"error": error_code}, REDIRECTOR_NEGATIVE_TTL)
+                            return "LINK_DOWN" if error_code == "LINK_DOWN" else None
+                        
+                        delay = self.retry_policy.delay(attempt, waited=waited)
+                        logger.error(f"Redirector error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')} (attempt {attempt + 1}/{max_retries}, retry in {delay}s)")
+                        await sleep(delay)
+                        waited += delay
+                        continue
+                    
+                    redirected_links = data1.get("data", {}).get("links", [])
+                    if not redirected_links:
+                        delay = self.retry_policy.delay(attempt, waited=waited)
+                        logger.error(f"No redirected links (attempt {attempt + 1}/{max_retries}, retry in {delay}s)")
+                        await sleep(delay)
+                        waited += delay
+                        continue
+                    
+                    await self._cache_redirect(dl_protect_link, {"links": redirected_links}, REDIRECTOR_CACHE_TTL)
                 
                 # --- Step 2: Unlock first link ---
                 first_link = redirected_links[0]
-                response2 = await http_client.get(
-                    f"{ALLDEBRID_API_URL}/link/unlock",
-                    params={"agent": "Wawacity", "apikey": apikey, "link": first_link}
+                response2 = await self._request(
+                    "link/unlock",
+                    {"agent": "Wawacity", "apikey": apikey, "link": first_link},
+                    UNLOCK_FINAL_ERRORS
                 )
                 
                 if response2.status_code != 200:
-                    logger.error(f"Unlock failed: {response2.status_code} (attempt {attempt + 1}/{ALLDEBRID_MAX_RETRIES}, retry in {RETRY_DELAY_SECONDS}s)")
-                    await sleep(RETRY_DELAY_SECONDS)
+                    retry_after = parse_retry_after(response2)
+                    delay = self.retry_policy.delay(attempt, retry_after, waited)
+                    logger.error(f"Unlock failed: {response2.status_code} (attempt {attempt + 1}/{max_retries}, retry in {delay}s)")
+                    await sleep(delay)
+                    waited += delay
                     continue
                 
                 data2 = response2.json()
@@ -70,22 +162,30 @@ class AllDebridService:
                         logger.error(f"Unlock error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')}")
                         return "LINK_DOWN"
                     
-                    logger.error(f"Unlock error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')} (attempt {attempt + 1}/{ALLDEBRID_MAX_RETRIES}, retry in {RETRY_DELAY_SECONDS}s)")
-                    await sleep(RETRY_DELAY_SECONDS)
+                    delay = self.retry_policy.delay(attempt, waited=waited)
+                    logger.error(f"Unlock error: {error.get('code', 'UNKNOWN')} - {error.get('message', 'Unknown')} (attempt {attempt + 1}/{max_retries}, retry in {delay}s)")
+                    await sleep(delay)
+                    waited += delay
                     continue
                 
                 direct_link = data2.get("data", {}).get("link")
                 if direct_link:
                     logger.log("ALLDEBRID", "Link converted successfully")
                     return direct_link
-                
+            
+            except CircuitBreakerOpen:
+                logger.error("AllDebrid circuit open, failing fast")
+                return None
+            
             except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed: {e} (attempt {attempt + 1}/{ALLDEBRID_MAX_RETRIES}, retry in {RETRY_DELAY_SECONDS}s)")
-                if attempt < ALLDEBRID_MAX_RETRIES - 1:
-                    await sleep(RETRY_DELAY_SECONDS)
+                delay = self.retry_policy.delay(attempt, waited=waited)
+                logger.error(f"Attempt {attempt + 1} failed: {e} (attempt {attempt + 1}/{max_retries}, retry in {delay}s)")
+                if attempt < max_retries - 1:
+                    await sleep(delay)
+                    waited += delay
         
-        logger.error(f"Failed after {ALLDEBRID_MAX_RETRIES} attempts")
+        logger.error(f"Failed after {attempts} attempts ({waited:.1f}s of backoff)")
         return None
 
 # --- Global instance ---
-alldebrid_service = AllDebridService()
\ No newline at end of file
+alldebrid_service = AllDebridService()
@@ -1,33 +1,92 @@
-from typing import List, Dict, Optional
+import asyncio
+import orjson
+from time import perf_counter
+from typing import Awaitable, Callable, List, Dict, Optional, Set, Tuple
 from wawacity.services.tmdb import tmdb_service
 from wawacity.services.alldebrid import alldebrid_service
 from wawacity.scrapers.movie import movie_scraper
 from wawacity.scrapers.series import series_scraper
-from wawacity.utils.database import SearchLock, is_dead_link, mark_dead_link, database
-from wawacity.utils.cache import get_cache, set_cache
+from wawacity.scrapers.base import BaseScraper, PageContext
+from wawacity.utils.database import SearchLock, get_dead_links, mark_dead_link, database
+from wawacity.utils.cache import (
+    get_cache, set_cache, get_series_cache, set_series_cache, 
+    get_resolved_link, set_resolved_link, get_stream_response, set_stream_response,
+    invalidate_stream_responses
+)
 from wawacity.utils.validators import extract_media_info
-from wawacity.utils.helpers import encode_config_to_base64, quote_url_param
+from wawacity.utils.singleflight import single_flight
+from wawacity.utils.progress import ScrapeProgress
+from wawacity.utils.popularity import popularity_tracker
+from wawacity.utils.metrics import SCRAPES_IN_FLIGHT, observe_stage
+from wawacity.utils.helpers import create_cache_key, create_link_cache_key, create_stream_response_key, quote_url_param
 from wawacity.utils.logger import logger
-from wawacity.core.config import CONTENT_CACHE_TTL, DEAD_LINK_TTL
+from wawacity.core.config import (
+    CONTENT_CACHE_TTL, DEAD_LINK_TTL, SCRAPE_WAIT_TIMEOUT, RESOLVED_LINK_TTL,
+    PRERESOLVE_ENABLED, PRERESOLVE_TOP_N, PRERESOLVE_WORKERS, PRERESOLVE_QUEUE_SIZE,
+    SERIES_TARGETED_SCRAPING, EARLY_RESPONSE_MIN_PAGES, EARLY_RESPONSE_BUDGET, STREAM_RESPONSE_CACHE_TTL,
+    WARMER_ENABLED
+)
 
 class StreamService:
     
-    # --- Main stream entry point ---
+    def __init__(self):
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._preresolve_queue: asyncio.Queue = asyncio.Queue(maxsize=PRERESOLVE_QUEUE_SIZE)
+        self._preresolve_workers: List[asyncio.Task] = []
+        self._series_contexts: Dict[str, PageContext] = {}
+        self._scrape_progress: Dict[str, ScrapeProgress] = {}
+    
+    # --- Main stream entry point, returns the serialized response ---
     async def get_streams(self, content_type: str, content_id: str, 
-                         config: Dict, base_url: str) -> List[Dict]:
+                         config: Dict, b64config: str, base_url: str) -> bytes:
+        request_start = perf_counter()
+        try:
+            return await self._get_streams(content_type, content_id, config, b64config, base_url)
+        finally:
+            observe_stage("total", request_start)
+    
+    async def _get_streams(self, content_type: str, content_id: str, 
+                          config: Dict, b64config: str, base_url: str) -> bytes:
         media_info = extract_media_info(content_id, content_type)
         
+        stage_start = perf_counter()
         metadata = await self._get_metadata(
             media_info["imdb_id"], 
             config.get("tmdb", "")
         )
+        observe_stage("tmdb", stage_start)
         
         if not metadata:
             logger.error(f"Failed to fetch TMDB metadata for {media_info['imdb_id']}")
             logger.error("Check: 1) Valid IMDB ID 2) Valid TMDB key 3) Network connectivity")
-            return []
+            return self._render_streams([])
+        
+        # --- Counters are only flushed by the warmer ---
+        if WARMER_ENABLED:
+            popularity_tracker.record(
+                "serie" if content_type == "series" else "film",
+                metadata["title"],
+                metadata.get("year"),
+                media_info["imdb_id"]
+            )
+        
+        # --- Pre-rendered response for this content and configuration ---
+        if content_type == "series":
+            content_key = create_cache_key("serie", metadata["title"], metadata.get("year"))
+            content_key += f":{media_info.get('season')}:{media_info.get('episode')}"
+        else:
+            content_key = create_cache_key("film", metadata["title"], metadata.get("year"))
+        response_key = create_stream_response_key(content_key, b64config, base_url)
         
-        results = await self._search_content(
+        cached_response = get_stream_response(response_key)
+        if cached_response is not None:
+            payload, top_links = cached_response
+            logger.log("STREAM", "Returning pre-rendered streams")
+            if PRERESOLVE_ENABLED:
+                self._schedule_preresolve(top_links, config.get("alldebrid", ""))
+            return payload
+        
+        results, complete = await self._search_content(
             metadata["title"],
             metadata.get("year"),
             content_type,
@@ -38,17 +97,20 @@ class StreamService:
         if not results:
             logger.error(f"No content found for '{metadata['title']}' ({metadata.get('year', 'N/A')})")
             logger.error("Possible causes: 1) Content not available on Wawacity 2) Search term mismatch 3) Site accessibility issues")
-            return []
+            return self._render_streams([])
         
-        streams = await self._format_streams(
+        streams, stream_links = await self._format_streams(
             results,
-            config,
+            b64config,
             base_url,
             media_info.get("season"),
             media_info.get("episode"),
             metadata.get("year")
         )
         
+        # --- Filtering keeps the stream objects, so their links stay reachable ---
+        link_by_stream = {id(stream): link for stream, link in zip(streams, stream_links)}
+        
         # --- Apply excluded words filter ---
         excluded_words = config.get("excluded_words", [])
         if excluded_words:
@@ -56,9 +118,26 @@ class StreamService:
             excluded_count = len(streams) - len(filtered_streams)
             if excluded_count > 0:
                 logger.log("STREAM", f"Excluded {excluded_count} streams by filter")
-            return filtered_streams
+            streams = filtered_streams
         
-        return streams
+        # --- Speculative resolution of top-ranked streams ---
+        top_links = self._top_links(streams, link_by_stream)
+        if PRERESOLVE_ENABLED:
+            self._schedule_preresolve(top_links, config.get("alldebrid", ""))
+        
+        payload = self._render_streams(streams)
+        
+        # --- Early responses are partial, only complete result sets are kept ---
+        if complete and STREAM_RESPONSE_CACHE_TTL > 0:
+            links = frozenset(res.get("dl_protect") for res in results if res.get("dl_protect"))
+            set_stream_response(response_key, payload, links, top_links, STREAM_RESPONSE_CACHE_TTL)
+        
+        return payload
+    
+    # --- Stremio response serialization ---
+    @staticmethod
+    def _render_streams(streams: List[Dict]) -> bytes:
+        return orjson.dumps({"streams": streams, "cacheMaxAge": 1})
     
     # --- Metadata retrieval ---
     async def _get_metadata(self, imdb_id: str, tmdb_key: str) -> Optional[Dict]:
@@ -67,20 +146,48 @@ class StreamService:
     # --- Content search dispatcher ---
     async def _search_content(self, title: str, year: Optional[str], 
                              content_type: str, season: Optional[str], 
-                             episode: Optional[str]) -> List[Dict]:
+                             episode: Optional[str]) -> Tuple[List[Dict], bool]:
         if content_type == "series":
             return await self._search_series(title, year, season, episode)
         else:
             return await self._search_movie(title, year)
     
     # --- Movie search with cache ---
-    async def _search_movie(self, title: str, year: Optional[str]) -> List[Dict]:
-        async with SearchLock("film", title, year):
-            cached_results = await get_cache(database, "film", title, year)
+    async def _search_movie(self, title: str, year: Optional[str]) -> Tuple[List[Dict], bool]:
+        # --- Lock-free fast path ---
+        stage_start = perf_counter()
+        cached_results, is_stale = await get_cache(database, "film", title, year, allow_stale=True)
+        observe_stage("cache_read", stage_start)
+        if cached_results is not None:
+            if is_stale:
+                self._schedule_refresh("film", title, year)
+            return cached_results, True
+        
+        cache_key = create_cache_key("film", title, year)
+        return await self._await_scrape(
+            cache_key, 
+            lambda progress: self._fetch_movie(title, year, progress=progress), 
+            lambda result: True
+        )
+    
+    async def _fetch_movie(self, title: str, year: Optional[str], 
+                          lock_timeout: int = SCRAPE_WAIT_TIMEOUT, min_remaining: int = 0, 
+                          progress: Optional[ScrapeProgress] = None) -> List[Dict]:
+        async with SearchLock("film", title, year, lock_timeout) as lock:
+            if not lock.acquired and lock_timeout == 0:
+                if progress is not None:
+                    progress.skipped = True
+                return []
+            
+            # --- Re-check once the lock is held ---
+            cached_results, _ = await get_cache(database, "film", title, year, min_remaining=min_remaining)
             if cached_results is not None:
                 return cached_results
             
-            results = await movie_scraper.search(title, year)
+            progress = progress or ScrapeProgress()
+            with SCRAPES_IN_FLIGHT.track_inprogress():
+                results = await progress.consume(movie_scraper.iter_search(title, year))
+            results = movie_scraper.sort_results(results)
             
             if results:
                 await set_cache(
@@ -90,52 +197,224 @@ class StreamService:
             
             return results
     
-    # --- Series search with cache and filtering ---
+    # --- Series search with per-episode cache ---
     async def _search_series(self, title: str, year: Optional[str], 
-                            season: Optional[str], episode: Optional[str]) -> List[Dict]:
-        async with SearchLock("serie", title, year):
-            cached_results = await get_cache(database, "serie", title, year)
+                            season: Optional[str], episode: Optional[str]) -> Tuple[List[Dict], bool]:
+        # --- Lock-free fast path ---
+        stage_start = perf_counter()
+        cached_results, is_stale = await get_series_cache(database, title, year, season, episode, allow_stale=True)
+        observe_stage("cache_read", stage_start)
+        if cached_results is not None:
+            if is_stale:
+                self._schedule_refresh("serie", title, year)
+            return cached_results, True
+        
+        cache_key = create_cache_key("serie", title, year)
+        match = None
+        if season and episode:
+            match = lambda r: r.get("season") == season and r.get("episode") == episode
+        
+        # --- Targeted mode: requested season first, full series in background ---
+        if match and SERIES_TARGETED_SCRAPING:
+            filtered, complete = await self._await_scrape(
+                f"{cache_key}:season:{season}", 
+                lambda progress: self._fetch_series_season(title, year, season, progress), 
+                match
+            )
+            if filtered:
+                logger.log("STREAM", f"Filtered S{season}E{episode}: {len(filtered)} results (targeted)")
+                return filtered, complete
+        
+        results, complete = await self._await_scrape(
+            cache_key, 
+            lambda progress: self._fetch_series(
+                title, year, context=self._series_contexts.get(cache_key), progress=progress
+            ), 
+            match
+        )
+        
+        if match:
+            logger.log("STREAM", f"Filtered S{season}E{episode}: {len(results)} results")
+        
+        return results, complete
+    
+    async def _fetch_series(self, title: str, year: Optional[str], 
+                           lock_timeout: int = SCRAPE_WAIT_TIMEOUT, min_remaining: int = 0, 
+                           context: Optional[PageContext] = None, 
+                           progress: Optional[ScrapeProgress] = None) -> List[Dict]:
+        async with SearchLock("serie", title, year, lock_timeout) as lock:
+            if not lock.acquired and lock_timeout == 0:
+                if progress is not None:
+                    progress.skipped = True
+                return []
+            
+            # --- Re-check once the lock is held ---
+            cached_results, _ = await get_series_cache(database, title, year, min_remaining=min_remaining)
             if cached_results is not None:
-                if season and episode:
-                    filtered = [
-                        r for r in cached_results 
-                        if r.get("season") == season and r.get("episode") == episode
-                    ]
-                    logger.log("STREAM", f"Filtered S{season}E{episode}: {len(filtered)} results")
-                    return filtered
                 return cached_results
             
-            results = await series_scraper.search(title, year)
+            progress = progress or ScrapeProgress()
+            with SCRAPES_IN_FLIGHT.track_inprogress():
+                results = await progress.consume(series_scraper.iter_search(title, year, context=context))
+            results = series_scraper.sort_results(results)
             
             if results:
-                await set_cache(
-                    database, "serie", title, year, 
+                await set_series_cache(
+                    database, title, year, 
                     results, CONTENT_CACHE_TTL
                 )
             
-            if season and episode:
-                filtered = [
-                    r for r in results 
-                    if r.get("season") == season and r.get("episode") == episode
-                ]
-                logger.log("STREAM", f"Filtered S{season}E{episode}: {len(filtered)} results")
-                return filtered
-            
             return results
     
+    # --- Requested season only, pages shared with the background fill ---
+    async def _fetch_series_season(self, title: str, year: Optional[str], season: str, 
+                                  progress: Optional[ScrapeProgress] = None) -> List[Dict]:
+        cache_key = create_cache_key("serie", title, year)
+        context = self._series_contexts.get(cache_key)
+        start_fill = context is None
+        if start_fill:
+            context = PageContext()
+            self._series_contexts[cache_key] = context
+        
+        progress = progress or ScrapeProgress()
+        try:
+            with SCRAPES_IN_FLIGHT.track_inprogress():
+                results = await progress.consume(series_scraper.iter_search(title, year, season=season, context=context))
+        finally:
+            if start_fill:
+                self._schedule_series_fill(title, year, context)
+        
+        return series_scraper.sort_results(results)
+    
+    # --- Background fill of the remaining seasons ---
+    def _schedule_series_fill(self, title: str, year: Optional[str], context: PageContext):
+        task = asyncio.create_task(self._fill_series(title, year, context))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _fill_series(self, title: str, year: Optional[str], context: PageContext):
+        cache_key = create_cache_key("serie", title, year)
+        
+        logger.log("CACHE", f"Filling remaining seasons: {title} ({year})")
+        try:
+            # --- Skip if another instance holds the scrape lock ---
+            task, _ = self._start_scrape(
+                cache_key, 
+                lambda progress: self._fetch_series(title, year, lock_timeout=0, context=context, progress=progress)
+            )
+            await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"Background series fill failed for {cache_key}: {e}")
+        finally:
+            if self._series_contexts.get(cache_key) is context:
+                del self._series_contexts[cache_key]
+    
+    # --- Shared scrape with page progress visible to joining callers ---
+    def _start_scrape(self, key: str, 
+                      fetch: Callable[[ScrapeProgress], Awaitable[List[Dict]]]) -> Tuple[asyncio.Task, ScrapeProgress]:
+        progress = self._scrape_progress.get(key) or ScrapeProgress()
+        
+        def start():
+            self._scrape_progress[key] = progress
+            return self._track_progress(key, progress, fetch(progress))
+        
+        return single_flight.start(key, start), progress
+    
+    async def _track_progress(self, key: str, progress: ScrapeProgress, fetch: Awaitable[List[Dict]]) -> List[Dict]:
+        try:
+            return await fetch
+        finally:
+            if self._scrape_progress.get(key) is progress:
+                del self._scrape_progress[key]
+    
+    # --- Early response once enough pages matched, remaining pages finish in background ---
+    async def _await_scrape(self, key: str, fetch: Callable[[ScrapeProgress], Awaitable[List[Dict]]], 
+                            match: Optional[Callable[[Dict], bool]] = None) -> Tuple[List[Dict], bool]:
+        task, progress = self._start_scrape(key, fetch)
+        
+        if match and EARLY_RESPONSE_MIN_PAGES > 0:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + EARLY_RESPONSE_BUDGET
+            while not task.done():
+                matched, pages = progress.matching(match)
+                budget_spent = loop.time() >= deadline
+                if matched and (pages >= EARLY_RESPONSE_MIN_PAGES or budget_spent):
+                    logger.log("STREAM", f"Early response: {len(matched)} results from {pages}/{progress.pages} loaded pages")
+                    return sorted(matched, key=BaseScraper.quality_sort_key), False
+                
+                await asyncio.wait(
+                    {task, progress.changed()}, 
+                    timeout=None if budget_spent else deadline - loop.time(), 
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+        
+        # --- Shield so one cancelled caller does not cancel the others ---
+        results = await asyncio.shield(task)
+        
+        # --- Joined a background scrape that skipped the lock: wait for it with the caller's own fetch ---
+        if progress.skipped:
+            return await self._await_scrape(key, fetch, match)
+        
+        if match:
+            return [r for r in results if match(r)], True
+        return results, True
+    
+    # --- Background refresh of stale entries ---
+    def _schedule_refresh(self, content_type: str, title: str, year: Optional[str]):
+        cache_key = create_cache_key(content_type, title, year)
+        if single_flight.is_running(cache_key):
+            return
+        
+        task = asyncio.create_task(self._refresh(content_type, title, year))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _refresh(self, content_type: str, title: str, year: Optional[str]):
+        cache_key = create_cache_key(content_type, title, year)
+        fetch = self._fetch_series if content_type == "serie" else self._fetch_movie
+        
+        logger.log("CACHE", f"Refreshing stale {content_type}: {title} ({year})")
+        try:
+            # --- Skip if another instance holds the scrape lock, joining callers retry ---
+            task, _ = self._start_scrape(cache_key, lambda progress: fetch(title, year, lock_timeout=0, progress=progress))
+            await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"Background refresh failed for {cache_key}: {e}")
+    
+    # --- Proactive refresh of entries about to expire ---
+    async def warm(self, content_type: str, title: str, year: Optional[str], min_remaining: int):
+        cache_key = create_cache_key(content_type, title, year)
+        if single_flight.is_running(cache_key):
+            return
+        
+        fetch = self._fetch_series if content_type == "serie" else self._fetch_movie
+        logger.log("CACHE", f"Warming {content_type}: {title} ({year})")
+        task, _ = self._start_scrape(
+            cache_key, 
+            lambda progress: fetch(title, year, lock_timeout=0, min_remaining=min_remaining, progress=progress)
+        )
+        await asyncio.shield(task)
+    
     # --- Stream formatting for Stremio ---
-    async def _format_streams(self, results: List[Dict], config: Dict, 
+    async def _format_streams(self, results: List[Dict], b64config: str, 
                              base_url: str, season: Optional[str], 
-                             episode: Optional[str], year: Optional[str]) -> List[Dict]:
+                             episode: Optional[str], year: Optional[str]) -> Tuple[List[Dict], List[str]]:
         streams = []
+        stream_links = []
         dead_links_count = 0
+        stage_start = perf_counter()
+        dead_links = await get_dead_links([res.get("dl_protect") for res in results])
+        observe_stage("dead_links", stage_start)
+        
+        # --- Configuration reused as received, quoted once ---
+        q_b64config = quote_url_param(b64config)
         
         for res in results:
             dl_link = res.get("dl_protect")
             if not dl_link:
                 continue
             
-            if await is_dead_link(dl_link):
+            if dl_link in dead_links:
                 dead_links_count += 1
                 continue
             
@@ -148,8 +427,6 @@ class StreamService:
             seas = res.get("season", "")
             
             q_link = quote_url_param(dl_link)
-            config_b64 = encode_config_to_base64(config)
-            q_b64config = quote_url_param(config_b64)
             
             playback_url = f"{base_url}/resolve?link={q_link}&b64config={q_b64config}"
             
@@ -180,22 +457,78 @@ class StreamService:
                 "description": "\r\n".join(description_parts),
                 "url": playback_url
             })
+            stream_links.append(dl_link)
         
         if dead_links_count > 0:
             logger.log("STREAM", f"Skipped {dead_links_count} dead links")
         
         logger.log("STREAM", f"Returning {len(streams)} stream(s)")
-        return streams
+        return streams, stream_links
     
     # --- Link resolution ---
     async def resolve_link(self, dl_protect_link: str, apikey: str) -> Optional[str]:
+        # --- Join a pending pre-resolution or concurrent retry of the same link ---
+        resolve_key = f"resolve:{create_link_cache_key(dl_protect_link, apikey)}"
+        return await single_flight.run(resolve_key, lambda: self._resolve_link(dl_protect_link, apikey))
+    
+    async def _resolve_link(self, dl_protect_link: str, apikey: str) -> Optional[str]:
+        cached_link = await get_resolved_link(database, dl_protect_link, apikey)
+        if cached_link:
+            logger.log("ALLDEBRID", f"Cached direct link for: {dl_protect_link}")
+            return cached_link
+        
+        stage_start = perf_counter()
         result = await alldebrid_service.convert_link(dl_protect_link, apikey)
+        observe_stage("alldebrid", stage_start)
         
         if result == "LINK_DOWN":
             await mark_dead_link(dl_protect_link, DEAD_LINK_TTL)
+            invalidate_stream_responses(dl_protect_link)
+        elif result:
+            await set_resolved_link(database, dl_protect_link, apikey, result, RESOLVED_LINK_TTL)
         
         return result
     
+    # --- dl-protect links of the top-ranked streams ---
+    @staticmethod
+    def _top_links(streams: List[Dict], link_by_stream: Dict[int, str]) -> Tuple[str, ...]:
+        return tuple(link_by_stream[id(stream)] for stream in streams[:PRERESOLVE_TOP_N])
+    
+    # --- Pre-resolution queue ---
+    def _schedule_preresolve(self, links: Tuple[str, ...], apikey: str):
+        if not apikey:
+            return
+        
+        for dl_protect_link in links:
+            try:
+                self._preresolve_queue.put_nowait((dl_protect_link, apikey))
+            except asyncio.QueueFull:
+                logger.log("ALLDEBRID", "Pre-resolution queue full, skipping")
+                break
+        
+        # --- Start workers lazily inside the running loop ---
+        self._preresolve_workers = [task for task in self._preresolve_workers if not task.done()]
+        while len(self._preresolve_workers) < PRERESOLVE_WORKERS:
+            self._preresolve_workers.append(asyncio.create_task(self._preresolve_worker()))
+    
+    async def _preresolve_worker(self):
+        while True:
+            dl_protect_link, apikey = await self._preresolve_queue.get()
+            try:
+                await self.resolve_link(dl_protect_link, apikey)
+            except Exception as e:
+                logger.error(f"Pre-resolution failed for {dl_protect_link}: {e}")
+            finally:
+                self._preresolve_queue.task_done()
+    
+    # --- Background work shutdown ---
+    async def close(self):
+        tasks = [*self._preresolve_workers, *self._background_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._preresolve_workers = []
+    
     # --- Filter streams by excluded words ---
     def _filter_excluded_words(self, streams: List[Dict], excluded_words: List[str]) -> List[Dict]:
         if not excluded_words:
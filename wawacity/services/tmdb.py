@@ -1,6 +1,8 @@
 from typing import Optional, Dict
 from wawacity.utils.http_client import http_client
-from wawacity.core.config import TMDB_API_URL
+from wawacity.utils.database import database
+from wawacity.utils.cache import get_metadata_cache, set_metadata_cache
+from wawacity.core.config import TMDB_API_URL, METADATA_CACHE_TTL
 from wawacity.utils.logger import logger
 
 class TMDBService:
@@ -9,6 +11,16 @@ class TMDBService:
     
     # --- Metadata fetching ---
     async def get_metadata(self, imdb_id: str, tmdb_key: str) -> Optional[Dict]:
+        # --- Cache errors fall through to the live lookup ---
+        try:
+            cached_metadata = await get_metadata_cache(database, imdb_id)
+        except Exception as e:
+            logger.error(f"Metadata cache lookup failed: {e}")
+            cached_metadata = None
+        if cached_metadata is not None:
+            logger.log("TMDB", f"Cached metadata for {imdb_id}: {cached_metadata['title']} ({cached_metadata.get('year', 'N/A')})")
+            return cached_metadata
+        
         url = f"{self.BASE_URL}/find/{imdb_id}?external_source=imdb_id"
         headers = {
             "Authorization": f"Bearer {tmdb_key}",
@@ -18,28 +30,50 @@ class TMDBService:
         try:
             response = await http_client.get(url, headers=headers, timeout=10)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # --- Check for movies ---
-                if data.get("movie_results"):
-                    movie = data["movie_results"][0]
-                    title = movie["original_title"] if movie.get("original_language") == "fr" else movie["title"]
-                    year = movie.get("release_date", "").split("-")[0]
-                    return {"title": title, "year": year, "type": "movie"}
-                
-                # --- Check for series ---
-                elif data.get("tv_results"):
-                    tv_show = data["tv_results"][0]
-                    title = tv_show["original_name"] if tv_show.get("original_language") == "fr" else tv_show["name"]
-                    year = tv_show.get("first_air_date", "").split("-")[0]
-                    return {"title": title, "year": year, "type": "series"}
+            if response.status_code != 200:
+                logger.error(f"TMDB metadata fetch failed: HTTP {response.status_code}")
+                return await self._get_stale_metadata(imdb_id)
             
-            return None
+            data = response.json()
+            metadata = None
+            
+            # --- Check for movies ---
+            if data.get("movie_results"):
+                movie = data["movie_results"][0]
+                title = movie["original_title"] if movie.get("original_language") == "fr" else movie["title"]
+                year = movie.get("release_date", "").split("-")[0]
+                metadata = {"title": title, "year": year, "type": "movie"}
+            
+            # --- Check for series ---
+            elif data.get("tv_results"):
+                tv_show = data["tv_results"][0]
+                title = tv_show["original_name"] if tv_show.get("original_language") == "fr" else tv_show["name"]
+                year = tv_show.get("first_air_date", "").split("-")[0]
+                metadata = {"title": title, "year": year, "type": "series"}
             
+            if metadata:
+                try:
+                    await set_metadata_cache(database, imdb_id, metadata, METADATA_CACHE_TTL)
+                except Exception as e:
+                    logger.error(f"Metadata cache write failed: {e}")
+            
+            return metadata
+        
         except Exception as e:
             logger.error(f"TMDB metadata fetch failed: {e}")
+            return await self._get_stale_metadata(imdb_id)
+    
+    # --- Stale fallback on TMDB errors ---
+    async def _get_stale_metadata(self, imdb_id: str) -> Optional[Dict]:
+        try:
+            stale_metadata = await get_metadata_cache(database, imdb_id, allow_stale=True)
+        except Exception as e:
+            logger.error(f"Stale metadata lookup failed: {e}")
             return None
+        
+        if stale_metadata is not None:
+            logger.log("TMDB", f"Serving stale metadata for {imdb_id}")
+        return stale_metadata
 
 # --- Global instance ---
-tmdb_service = TMDBService()
\ No newline at end of file
+tmdb_service = TMDBService()
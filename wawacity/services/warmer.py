@@ -0,0 +1,67 @@
+import asyncio
+import time
+from wawacity.services.stream import stream_service
+from wawacity.utils.database import database
+from wawacity.utils.popularity import popularity_tracker
+from wawacity.core.config import (
+    CONTENT_CACHE_TTL, CONTENT_CACHE_STALE_TTL, WARMER_INTERVAL, WARMER_LEAD_TIME,
+    WARMER_MIN_HITS, WARMER_WINDOW, WARMER_MAX_CONCURRENCY, WARMER_MAX_PER_MINUTE
+)
+from wawacity.utils.logger import logger
+
+class CacheWarmer:
+    
+    def __init__(self):
+        # --- Never refresh more than halfway through an entry's life ---
+        self.lead_time = min(WARMER_LEAD_TIME, CONTENT_CACHE_TTL // 2)
+        self.semaphore = asyncio.Semaphore(WARMER_MAX_CONCURRENCY)
+    
+    # --- Scheduler loop ---
+    async def run(self):
+        while True:
+            await asyncio.sleep(WARMER_INTERVAL)
+            try:
+                await popularity_tracker.flush(database)
+                await self._warm_cycle()
+            except Exception as e:
+                logger.error(f"Cache warmer error: {e}")
+    
+    # --- One warming pass within the scrape budget ---
+    async def _warm_cycle(self):
+        current_time = time.time()
+        budget = max(1, WARMER_MAX_PER_MINUTE * WARMER_INTERVAL // 60)
+        
+        candidates = await popularity_tracker.hottest_expiring(
+            database,
+            refresh_before=current_time + self.lead_time,
+            stale_limit=current_time - CONTENT_CACHE_STALE_TTL,
+            min_hits=WARMER_MIN_HITS,
+            seen_since=current_time - WARMER_WINDOW,
+            limit=budget
+        )
+        if not candidates:
+            return
+        
+        logger.log("CACHE", f"Warming {len(candidates)} popular entries")
+        
+        # --- Start at most WARMER_MAX_PER_MINUTE scrapes per minute ---
+        spacing = 60 / max(1, WARMER_MAX_PER_MINUTE)
+        tasks = []
+        for index, candidate in enumerate(candidates):
+            if index:
+                await asyncio.sleep(spacing)
+            await self.semaphore.acquire()
+            tasks.append(asyncio.create_task(self._warm(candidate)))
+        
+        await asyncio.gather(*tasks)
+    
+    async def _warm(self, candidate: dict):
+        try:
+            await stream_service.warm(candidate["content_type"], candidate["title"], candidate["year"], self.lead_time)
+        except Exception as e:
+            logger.error(f"Warming failed for {candidate['title']}: {e}")
+        finally:
+            self.semaphore.release()
+
+# --- Global instance ---
+cache_warmer = CacheWarmer()
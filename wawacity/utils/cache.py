@@ -1,46 +1,195 @@
 import json
 import time
-from typing import Optional, List, Dict, Any
-from wawacity.core.config import DATABASE_TYPE
-from wawacity.utils.helpers import create_cache_key
+import zlib
+import binascii
+import orjson
+from base64 import b64encode, b64decode
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple, Callable, FrozenSet
+from wawacity.core.config import (
+    DATABASE_TYPE, MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES, CONTENT_CACHE_STALE_TTL, CACHE_ENCODING
+)
+from wawacity.utils.helpers import create_cache_key, create_link_cache_key
+from wawacity.utils.metrics import CACHE_LOOKUPS
 from wawacity.utils.logger import logger
 
+# --- Versioned result set encoding ---
+COMPACT_PREFIX = "z1:"
+
+def encode_results(results: List[Dict], encoding: str = CACHE_ENCODING) -> Tuple[str, int]:
+    raw = orjson.dumps(results)
+    if encoding == "compact":
+        return COMPACT_PREFIX + b64encode(zlib.compress(raw)).decode(), len(raw)
+    return raw.decode(), len(raw)
+
+# --- Compact and plain JSON rows are both readable, returns results and decoded size ---
+def decode_results(content: str) -> Tuple[List[Dict], int]:
+    if content.startswith(COMPACT_PREFIX):
+        try:
+            raw = zlib.decompress(b64decode(content[len(COMPACT_PREFIX):]))
+        except (binascii.Error, zlib.error) as e:
+            raise ValueError(f"Invalid compact entry: {e}")
+        return orjson.loads(raw), len(raw)
+    return orjson.loads(content), len(content)
+
+# --- In-memory LRU tier ---
+class MemoryCache:
+    
+    def __init__(self, max_entries: int, max_bytes: int, stale_ttl: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.size_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+    
+    # --- Entry retrieval ---
+    def get(self, key: str) -> Optional[Any]:
+        value, _ = self.lookup(key, allow_stale=False)
+        return value
+    
+    def lookup(self, key: str, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        
+        value, expires_at, _ = entry
+        current_time = time.time()
+        if expires_at + self.stale_ttl <= current_time:
+            self.delete(key)
+            self.misses += 1
+            return None, False
+        
+        is_stale = expires_at <= current_time
+        if is_stale and not allow_stale:
+            self.misses += 1
+            return None, False
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if is_stale:
+            self.stale_hits += 1
+        return value, is_stale
+    
+    # --- Entry storage with eviction ---
+    def set(self, key: str, value: Any, expires_at: float, size: int):
+        self.delete(key)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        
+        self._entries[key] = (value, expires_at, size)
+        self.size_bytes += size
+        
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+    
+    # --- Entry removal ---
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[2]
+    
+    def delete_prefix(self, prefix: str):
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self.delete(key)
+    
+    def delete_where(self, predicate: Callable[[Any], bool]):
+        for key in [key for key, (value, _, _) in self._entries.items() if predicate(value)]:
+            self.delete(key)
+    
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+    
+    # --- Statistics ---
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+# --- Share of the MEMORY_CACHE_MAX_ENTRIES / MEMORY_CACHE_MAX_BYTES budget per tier ---
+MEMORY_TIER_SHARES = {
+    "content": 0.40,
+    "metadata": 0.05,
+    "resolved": 0.10,
+    "redirector": 0.05,
+    "stream": 0.20,
+    "page": 0.20,
+}
+
+def _memory_tier(name: str, stale_ttl: int = 0) -> MemoryCache:
+    share = MEMORY_TIER_SHARES[name]
+    max_entries = max(1, int(MEMORY_CACHE_MAX_ENTRIES * share)) if MEMORY_CACHE_MAX_ENTRIES > 0 else 0
+    return MemoryCache(max_entries, int(MEMORY_CACHE_MAX_BYTES * share), stale_ttl)
+
+# --- Global memory tiers, together bounded by the configured budget ---
+content_memory_cache = _memory_tier("content", CONTENT_CACHE_STALE_TTL)
+metadata_memory_cache = _memory_tier("metadata")
+resolved_memory_cache = _memory_tier("resolved")
+redirector_memory_cache = _memory_tier("redirector")
+stream_memory_cache = _memory_tier("stream")
+page_memory_cache = _memory_tier("page")
+
 # --- Cache retrieval ---
-async def get_cache(database, cache_type: str, title: str, year: Optional[str] = None) -> Optional[List[Dict]]:
+async def get_cache(database, cache_type: str, title: str, year: Optional[str] = None, 
+                   allow_stale: bool = False, min_remaining: int = 0) -> Tuple[Optional[List[Dict]], bool]:
     cache_key = create_cache_key(cache_type, title, year)
     
+    # --- Remaining lifetime checks go to the database, the shared source of truth ---
+    cached_data, is_stale = None, False
+    if not min_remaining:
+        cached_data, is_stale = content_memory_cache.lookup(cache_key, allow_stale)
+    if cached_data is not None:
+        CACHE_LOOKUPS.labels("content", "stale" if is_stale else "hit").inc()
+        logger.log("CACHE", f"Memory {'stale ' if is_stale else ''}hit for {cache_type}: {title} ({year}) - {len(cached_data)} results")
+        return cached_data, is_stale
+    
     current_time = time.time()
     result = await database.fetch_one(
-        "SELECT content FROM content_cache WHERE cache_key = :cache_key AND expires_at > :current_time",
-        {"cache_key": cache_key, "current_time": current_time}
+        "SELECT content, expires_at FROM content_cache WHERE cache_key = :cache_key AND expires_at > :min_expires_at",
+        {"cache_key": cache_key, "min_expires_at": _min_expires_at(current_time, allow_stale, min_remaining)}
     )
     
     if not result:
+        CACHE_LOOKUPS.labels("content", "miss").inc()
         logger.log("CACHE", f"Miss for {cache_type}: {title} ({year})")
-        return None
+        return None, False
     
     try:
-        cached_data = json.loads(result["content"])
-        logger.log("CACHE", f"Hit for {cache_type}: {title} ({year}) - {len(cached_data)} results")
-        return cached_data
-    except json.JSONDecodeError as e:
+        cached_data, size = decode_results(result["content"])
+    except ValueError as e:
         logger.error(f"Corrupted cache for {cache_key}: {e}")
-        return None
-
-# --- Cache storage ---
-async def set_cache(database, cache_type: str, title: str, year: Optional[str] = None, 
-                   results: Optional[List] = None, ttl: int = 3600):
-    cache_key = create_cache_key(cache_type, title, year)
-    
-    current_time = time.time()
-    expires_at = current_time + ttl
-    content = json.dumps(results or [])
+        return None, False
     
+    is_stale = result["expires_at"] <= current_time
+    CACHE_LOOKUPS.labels("content", "stale" if is_stale else "hit").inc()
+    content_memory_cache.set(cache_key, cached_data, result["expires_at"], size)
+    logger.log("CACHE", f"{'Stale hit' if is_stale else 'Hit'} for {cache_type}: {title} ({year}) - {len(cached_data)} results")
+    return cached_data, is_stale
+
+# --- Oldest expiry still servable ---
+def _min_expires_at(current_time: float, allow_stale: bool, min_remaining: int = 0) -> float:
+    return current_time - CONTENT_CACHE_STALE_TTL if allow_stale else current_time + min_remaining
+
+# --- Row upsert shared by cache tables ---
+async def _store_entry(database, table: str, cache_key: str, content: str, expires_at: float):
     if DATABASE_TYPE == "sqlite":
-        query = """INSERT OR REPLACE INTO content_cache (cache_key, content, expires_at) 
+        query = f"""INSERT OR REPLACE INTO {table} (cache_key, content, expires_at) 
                    VALUES (:cache_key, :content, :expires_at)"""
     else:
-        query = """INSERT INTO content_cache (cache_key, content, expires_at) 
+        query = f"""INSERT INTO {table} (cache_key, content, expires_at) 
                    VALUES (:cache_key, :content, :expires_at) 
                    ON CONFLICT (cache_key) DO UPDATE 
                    SET content = :content, expires_at = :expires_at"""
@@ -50,5 +199,269 @@ async def set_cache(database, cache_type: str, title: str, year: Optional[str] =
         "content": content,
         "expires_at": expires_at
     })
+
+# --- Cache storage ---
+async def set_cache(database, cache_type: str, title: str, year: Optional[str] = None, 
+                   results: Optional[List] = None, ttl: int = 3600):
+    cache_key = create_cache_key(cache_type, title, year)
+    
+    current_time = time.time()
+    expires_at = current_time + ttl
+    content, size = encode_results(results or [])
+    
+    await _store_entry(database, "content_cache", cache_key, content, expires_at)
+    content_memory_cache.set(cache_key, results or [], expires_at, size)
+    stream_memory_cache.delete_prefix(f"{cache_key}|")
+    
+    logger.log("CACHE", f"Saved {cache_type}: {title} ({year}) - {len(results or [])} results for {ttl}s")
+
+# --- Series episode retrieval ---
+async def get_series_cache(database, title: str, year: Optional[str] = None, 
+                          season: Optional[str] = None, episode: Optional[str] = None, 
+                          allow_stale: bool = False, min_remaining: int = 0) -> Tuple[Optional[List[Dict]], bool]:
+    if not (season and episode):
+        return await _get_full_series_cache(database, title, year, allow_stale, min_remaining)
+    
+    cache_key = create_cache_key("serie", title, year)
+    episode_key = f"{cache_key}:{season}:{episode}"
+    
+    cached_data, is_stale = content_memory_cache.lookup(episode_key, allow_stale)
+    if cached_data is not None:
+        CACHE_LOOKUPS.labels("content", "stale" if is_stale else "hit").inc()
+        logger.log("CACHE", f"Memory {'stale ' if is_stale else ''}hit for serie: {title} ({year}) S{season}E{episode} - {len(cached_data)} results")
+        return cached_data, is_stale
+    
+    # --- Series marker and episode rows in one round trip ---
+    current_time = time.time()
+    result = await database.fetch_one(
+        """SELECT c.expires_at, e.content FROM content_cache c 
+           LEFT JOIN episode_cache e ON e.cache_key = c.cache_key AND e.season = :season AND e.episode = :episode 
+           WHERE c.cache_key = :cache_key AND c.expires_at > :min_expires_at""",
+        {
+            "cache_key": cache_key, "season": season, "episode": episode, 
+            "min_expires_at": _min_expires_at(current_time, allow_stale)
+        }
+    )
+    
+    if not result:
+        CACHE_LOOKUPS.labels("content", "miss").inc()
+        logger.log("CACHE", f"Miss for serie: {title} ({year})")
+        return None, False
+    
+    try:
+        cached_data, size = decode_results(result["content"] or "[]")
+    except ValueError as e:
+        logger.error(f"Corrupted episode cache for {episode_key}: {e}")
+        return None, False
+    
+    is_stale = result["expires_at"] <= current_time
+    CACHE_LOOKUPS.labels("content", "stale" if is_stale else "hit").inc()
+    content_memory_cache.set(episode_key, cached_data, result["expires_at"], size)
+    logger.log("CACHE", f"{'Stale hit' if is_stale else 'Hit'} for serie: {title} ({year}) S{season}E{episode} - {len(cached_data)} results")
+    return cached_data, is_stale
+
+async def _get_full_series_cache(database, title: str, year: Optional[str], 
+                                allow_stale: bool, min_remaining: int) -> Tuple[Optional[List[Dict]], bool]:
+    cache_key = create_cache_key("serie", title, year)
+    
+    current_time = time.time()
+    marker = await database.fetch_one(
+        "SELECT expires_at FROM content_cache WHERE cache_key = :cache_key AND expires_at > :min_expires_at",
+        {"cache_key": cache_key, "min_expires_at": _min_expires_at(current_time, allow_stale, min_remaining)}
+    )
+    
+    if not marker:
+        CACHE_LOOKUPS.labels("content", "miss").inc()
+        logger.log("CACHE", f"Miss for serie: {title} ({year})")
+        return None, False
+    
+    rows = await database.fetch_all(
+        "SELECT season, episode, content FROM episode_cache WHERE cache_key = :cache_key",
+        {"cache_key": cache_key}
+    )
+    
+    cached_data = []
+    try:
+        for row in sorted(rows, key=lambda r: (int(r["season"]), int(r["episode"]))):
+            cached_data.extend(decode_results(row["content"])[0])
+    except ValueError as e:
+        logger.error(f"Corrupted episode cache for {cache_key}: {e}")
+        return None, False
+    
+    is_stale = marker["expires_at"] <= current_time
+    CACHE_LOOKUPS.labels("content", "stale" if is_stale else "hit").inc()
+    logger.log("CACHE", f"{'Stale hit' if is_stale else 'Hit'} for serie: {title} ({year}) - {len(cached_data)} results")
+    return cached_data, is_stale
+
+# --- Series storage indexed by episode ---
+async def set_series_cache(database, title: str, year: Optional[str] = None, 
+                          results: Optional[List] = None, ttl: int = 3600):
+    cache_key = create_cache_key("serie", title, year)
+    
+    current_time = time.time()
+    expires_at = current_time + ttl
+    
+    episodes: Dict[Tuple[str, str], List[Dict]] = {}
+    for result in results or []:
+        episodes.setdefault((result.get("season", ""), result.get("episode", "")), []).append(result)
+    
+    rows = [
+        {
+            "cache_key": cache_key,
+            "season": season,
+            "episode": episode,
+            "content": encode_results(episode_results)[0],
+            "expires_at": expires_at
+        }
+        for (season, episode), episode_results in episodes.items()
+    ]
+    marker = json.dumps({"episodes": len(rows), "results": len(results or [])})
+    
+    async with database.transaction():
+        await database.execute(
+            "DELETE FROM episode_cache WHERE cache_key = :cache_key",
+            {"cache_key": cache_key}
+        )
+        if rows:
+            await database.execute_many(
+                """INSERT INTO episode_cache (cache_key, season, episode, content, expires_at) 
+                   VALUES (:cache_key, :season, :episode, :content, :expires_at)""",
+                rows
+            )
+        await _store_entry(database, "content_cache", cache_key, marker, expires_at)
+    
+    content_memory_cache.delete_prefix(f"{cache_key}:")
+    stream_memory_cache.delete_prefix(f"{cache_key}:")
+    
+    logger.log("CACHE", f"Saved serie: {title} ({year}) - {len(results or [])} results in {len(rows)} episodes for {ttl}s")
+
+# --- Rendered stream responses (memory only) ---
+def get_stream_response(response_key: str) -> Optional[Tuple[bytes, Tuple[str, ...]]]:
+    entry = stream_memory_cache.get(response_key)
+    CACHE_LOOKUPS.labels("stream_response", "hit" if entry is not None else "miss").inc()
+    return (entry[0], entry[2]) if entry is not None else None
+
+# --- Payload, every link it references (for invalidation) and its top-ranked links (for pre-resolution) ---
+def set_stream_response(response_key: str, payload: bytes, links: FrozenSet[str], 
+                        top_links: Tuple[str, ...], ttl: int):
+    stream_memory_cache.set(response_key, (payload, links, top_links), time.time() + ttl, len(payload))
+
+def invalidate_stream_responses(dl_protect_link: str):
+    stream_memory_cache.delete_where(lambda entry: dl_protect_link in entry[1])
+
+# --- Page validators and extracted records (memory only) ---
+def get_page_validator(page_key: str) -> Optional[Dict]:
+    return page_memory_cache.get(page_key)
+
+def set_page_validator(page_key: str, entry: Dict, ttl: int):
+    page_memory_cache.set(page_key, entry, time.time() + ttl, entry["size"])
+
+# --- Metadata retrieval ---
+async def get_metadata_cache(database, imdb_id: str, allow_stale: bool = False) -> Optional[Dict]:
+    if not allow_stale:
+        metadata = metadata_memory_cache.get(imdb_id)
+        if metadata is not None:
+            CACHE_LOOKUPS.labels("metadata", "hit").inc()
+            return metadata
+    
+    current_time = time.time()
+    if allow_stale:
+        result = await database.fetch_one(
+            "SELECT content, expires_at FROM metadata_cache WHERE cache_key = :cache_key",
+            {"cache_key": imdb_id}
+        )
+    else:
+        result = await database.fetch_one(
+            "SELECT content, expires_at FROM metadata_cache WHERE cache_key = :cache_key AND expires_at > :current_time",
+            {"cache_key": imdb_id, "current_time": current_time}
+        )
+    
+    if not result:
+        CACHE_LOOKUPS.labels("metadata", "miss").inc()
+        return None
+    
+    try:
+        metadata = json.loads(result["content"])
+    except json.JSONDecodeError as e:
+        logger.error(f"Corrupted metadata cache for {imdb_id}: {e}")
+        return None
+    
+    is_stale = result["expires_at"] <= current_time
+    CACHE_LOOKUPS.labels("metadata", "stale" if is_stale else "hit").inc()
+    if not is_stale:
+        metadata_memory_cache.set(imdb_id, metadata, result["expires_at"], len(result["content"]))
+    return metadata
+
+# --- Metadata storage ---
+async def set_metadata_cache(database, imdb_id: str, metadata: Dict, ttl: int):
+    expires_at = int(time.time()) + ttl
+    content = json.dumps(metadata)
+    
+    await _store_entry(database, "metadata_cache", imdb_id, content, expires_at)
+    metadata_memory_cache.set(imdb_id, metadata, expires_at, len(content))
+
+# --- Resolved link retrieval ---
+async def get_resolved_link(database, dl_protect_link: str, apikey: str) -> Optional[str]:
+    cache_key = create_link_cache_key(dl_protect_link, apikey)
+    
+    direct_link = resolved_memory_cache.get(cache_key)
+    if direct_link is not None:
+        CACHE_LOOKUPS.labels("resolved_link", "hit").inc()
+        return direct_link
+    
+    current_time = time.time()
+    result = await database.fetch_one(
+        "SELECT content, expires_at FROM resolved_links WHERE cache_key = :cache_key AND expires_at > :current_time",
+        {"cache_key": cache_key, "current_time": current_time}
+    )
+    
+    if not result:
+        CACHE_LOOKUPS.labels("resolved_link", "miss").inc()
+        return None
+    
+    CACHE_LOOKUPS.labels("resolved_link", "hit").inc()
+    resolved_memory_cache.set(cache_key, result["content"], result["expires_at"], len(result["content"]))
+    return result["content"]
+
+# --- Resolved link storage ---
+async def set_resolved_link(database, dl_protect_link: str, apikey: str, direct_link: str, ttl: int):
+    cache_key = create_link_cache_key(dl_protect_link, apikey)
+    expires_at = int(time.time()) + ttl
+    
+    await _store_entry(database, "resolved_links", cache_key, direct_link, expires_at)
+    resolved_memory_cache.set(cache_key, direct_link, expires_at, len(direct_link))
+
+# --- Redirector result retrieval (shared by all users) ---
+async def get_redirector_cache(database, dl_protect_link: str) -> Optional[Dict]:
+    entry = redirector_memory_cache.get(dl_protect_link)
+    if entry is not None:
+        CACHE_LOOKUPS.labels("redirector", "hit").inc()
+        return entry
+    
+    current_time = time.time()
+    result = await database.fetch_one(
+        "SELECT content, expires_at FROM redirector_cache WHERE cache_key = :cache_key AND expires_at > :current_time",
+        {"cache_key": dl_protect_link, "current_time": current_time}
+    )
+    
+    if not result:
+        CACHE_LOOKUPS.labels("redirector", "miss").inc()
+        return None
+    
+    CACHE_LOOKUPS.labels("redirector", "hit").inc()
+    try:
+        entry = json.loads(result["content"])
+    except json.JSONDecodeError as e:
+        logger.error(f"Corrupted redirector cache for {dl_protect_link}: {e}")
+        return None
+    
+    redirector_memory_cache.set(dl_protect_link, entry, result["expires_at"], len(result["content"]))
+    return entry
+
+# --- Redirector result storage ---
+async def set_redirector_cache(database, dl_protect_link: str, entry: Dict, ttl: int):
+    expires_at = int(time.time()) + ttl
+    content = json.dumps(entry)
     
-    logger.log("CACHE", f"Saved {cache_type}: {title} ({year}) - {len(results or [])} results for {ttl}s")
\ No newline at end of file
+    await _store_entry(database, "redirector_cache", dl_protect_link, content, expires_at)
+    redirector_memory_cache.set(dl_protect_link, entry, expires_at, len(content))
@@ -1,18 +1,22 @@
 import os
 import time
 import asyncio
-from typing import Optional
+from uuid import uuid4
+from typing import Optional, List, Set
 from databases import Database
 from wawacity.core.config import (
     DATABASE_VERSION, DATABASE_PATH, DATABASE_TYPE, 
     get_database_url, CLEANUP_INTERVAL, SCRAPE_LOCK_TTL,
-    SCRAPE_WAIT_TIMEOUT
+    SCRAPE_WAIT_TIMEOUT, METADATA_STALE_TTL, CONTENT_CACHE_STALE_TTL, WARMER_WINDOW
 )
 from wawacity.utils.helpers import create_cache_key
+from wawacity.utils.metrics import LOCK_ACQUISITIONS, observe_stage
 from wawacity.utils.logger import logger
 
 database = Database(get_database_url())
 
+DEAD_LINK_BATCH_SIZE = 500
+
 # --- Database initialization ---
 async def setup_database():
     try:
@@ -35,11 +39,21 @@ async def setup_database():
                 await database.execute("DROP TABLE IF EXISTS dead_links")
                 await database.execute("DROP TABLE IF EXISTS scrape_lock")
                 await database.execute("DROP TABLE IF EXISTS content_cache")
+                await database.execute("DROP TABLE IF EXISTS episode_cache")
+                await database.execute("DROP TABLE IF EXISTS metadata_cache")
+                await database.execute("DROP TABLE IF EXISTS resolved_links")
+                await database.execute("DROP TABLE IF EXISTS redirector_cache")
+                await database.execute("DROP TABLE IF EXISTS popularity")
                 await database.execute("INSERT OR REPLACE INTO db_version VALUES (1, :version)", {"version": DATABASE_VERSION})
             else:
                 await database.execute("DROP TABLE IF EXISTS dead_links CASCADE")
                 await database.execute("DROP TABLE IF EXISTS scrape_lock CASCADE")
                 await database.execute("DROP TABLE IF EXISTS content_cache CASCADE")
+                await database.execute("DROP TABLE IF EXISTS episode_cache CASCADE")
+                await database.execute("DROP TABLE IF EXISTS metadata_cache CASCADE")
+                await database.execute("DROP TABLE IF EXISTS resolved_links CASCADE")
+                await database.execute("DROP TABLE IF EXISTS redirector_cache CASCADE")
+                await database.execute("DROP TABLE IF EXISTS popularity CASCADE")
                 await database.execute(
                     "INSERT INTO db_version VALUES (1, :version) ON CONFLICT (id) DO UPDATE SET version = :version",
                     {"version": DATABASE_VERSION}
@@ -49,11 +63,21 @@ async def setup_database():
         await database.execute("CREATE TABLE IF NOT EXISTS dead_links (url TEXT PRIMARY KEY, expires_at INTEGER)")
         await database.execute("CREATE TABLE IF NOT EXISTS scrape_lock (lock_key TEXT PRIMARY KEY, instance_id TEXT, expires_at INTEGER)")
         await database.execute("CREATE TABLE IF NOT EXISTS content_cache (cache_key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at INTEGER)")
+        await database.execute("CREATE TABLE IF NOT EXISTS episode_cache (cache_key TEXT, season TEXT, episode TEXT, content TEXT NOT NULL, expires_at INTEGER, PRIMARY KEY (cache_key, season, episode))")
+        await database.execute("CREATE TABLE IF NOT EXISTS metadata_cache (cache_key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at INTEGER)")
+        await database.execute("CREATE TABLE IF NOT EXISTS resolved_links (cache_key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at INTEGER)")
+        await database.execute("CREATE TABLE IF NOT EXISTS redirector_cache (cache_key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at INTEGER)")
+        await database.execute("CREATE TABLE IF NOT EXISTS popularity (cache_key TEXT PRIMARY KEY, content_type TEXT, title TEXT, year TEXT, imdb_id TEXT, hits INTEGER, last_seen INTEGER)")
         
         # --- Indexes for optimization ---
         await database.execute("CREATE INDEX IF NOT EXISTS idx_dead_links_expires ON dead_links(expires_at)")
         await database.execute("CREATE INDEX IF NOT EXISTS idx_scrape_lock_expires ON scrape_lock(expires_at)")
         await database.execute("CREATE INDEX IF NOT EXISTS idx_content_cache_expires ON content_cache(expires_at)")
+        await database.execute("CREATE INDEX IF NOT EXISTS idx_episode_cache_expires ON episode_cache(expires_at)")
+        await database.execute("CREATE INDEX IF NOT EXISTS idx_metadata_cache_expires ON metadata_cache(expires_at)")
+        await database.execute("CREATE INDEX IF NOT EXISTS idx_resolved_links_expires ON resolved_links(expires_at)")
+        await database.execute("CREATE INDEX IF NOT EXISTS idx_redirector_cache_expires ON redirector_cache(expires_at)")
+        await database.execute("CREATE INDEX IF NOT EXISTS idx_popularity_hits ON popularity(hits)")
 
         # --- SQLite configuration ---
         if DATABASE_TYPE == "sqlite":
@@ -86,14 +110,51 @@ async def cleanup_expired_data():
                 {"current_time": current_time}
             )
             
-            # --- Clean expired cache ---
+            # --- Clean cache past the stale window ---
             deleted_cache = await database.execute(
-                "DELETE FROM content_cache WHERE expires_at < :current_time",
+                "DELETE FROM content_cache WHERE expires_at < :stale_limit",
+                {"stale_limit": current_time - CONTENT_CACHE_STALE_TTL}
+            )
+            
+            # --- Clean episode rows past the stale window ---
+            deleted_episodes = await database.execute(
+                "DELETE FROM episode_cache WHERE expires_at < :stale_limit",
+                {"stale_limit": current_time - CONTENT_CACHE_STALE_TTL}
+            )
+            
+            # --- Clean metadata past the stale window ---
+            deleted_metadata = await database.execute(
+                "DELETE FROM metadata_cache WHERE expires_at < :stale_limit",
+                {"stale_limit": current_time - METADATA_STALE_TTL}
+            )
+            
+            # --- Clean expired resolved links ---
+            deleted_resolved = await database.execute(
+                "DELETE FROM resolved_links WHERE expires_at < :current_time",
+                {"current_time": current_time}
+            )
+            
+            # --- Clean expired redirector results ---
+            deleted_redirects = await database.execute(
+                "DELETE FROM redirector_cache WHERE expires_at < :current_time",
                 {"current_time": current_time}
             )
             
-            if deleted_locks or deleted_links or deleted_cache:
-                logger.log("CLEANUP", f"Removed: {deleted_locks} locks, {deleted_links} dead links, {deleted_cache} cache entries")
+            # --- Forget titles nobody asked for recently ---
+            deleted_popularity = await database.execute(
+                "DELETE FROM popularity WHERE last_seen < :window_start",
+                {"window_start": current_time - WARMER_WINDOW}
+            )
+            
+            if any((deleted_locks, deleted_links, deleted_cache, deleted_episodes, 
+                    deleted_metadata, deleted_resolved, deleted_redirects, deleted_popularity)):
+                logger.log(
+                    "CLEANUP", 
+                    f"Removed: {deleted_locks} locks, {deleted_links} dead links, {deleted_cache} cache entries, "
+                    f"{deleted_episodes} episode entries, {deleted_metadata} metadata entries, "
+                    f"{deleted_resolved} resolved links, {deleted_redirects} redirector entries, "
+                    f"{deleted_popularity} popularity entries"
+                )
                 
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
@@ -101,13 +162,27 @@ async def cleanup_expired_data():
         await asyncio.sleep(CLEANUP_INTERVAL)
 
 # --- Dead link management ---
-async def is_dead_link(url: str) -> bool:
+async def get_dead_links(urls: List[str]) -> Set[str]:
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    dead_urls = set()
     current_time = time.time()
-    result = await database.fetch_one(
-        "SELECT 1 FROM dead_links WHERE url = :url AND expires_at > :current_time",
-        {"url": url, "current_time": current_time}
-    )
-    return result is not None
+    
+    # --- One query per chunk to stay under SQL variable limits ---
+    for start in range(0, len(unique_urls), DEAD_LINK_BATCH_SIZE):
+        chunk = unique_urls[start:start + DEAD_LINK_BATCH_SIZE]
+        params = {"current_time": current_time}
+        placeholders = []
+        for index, url in enumerate(chunk):
+            params[f"url_{index}"] = url
+            placeholders.append(f":url_{index}")
+        
+        rows = await database.fetch_all(
+            f"SELECT url FROM dead_links WHERE expires_at > :current_time AND url IN ({', '.join(placeholders)})",
+            params
+        )
+        dead_urls.update(row["url"] for row in rows)
+    
+    return dead_urls
 
 async def mark_dead_link(url: str, ttl: int):
     current_time = time.time()
@@ -123,11 +198,12 @@ async def mark_dead_link(url: str, ttl: int):
     logger.log("DEAD_LINK", f"Marked as dead for {ttl}s: {url[:50]}...")
 
 # --- Lock management ---
-async def acquire_lock(lock_key: str, instance_id: str, duration: int = SCRAPE_LOCK_TTL) -> bool:
+async def acquire_lock(lock_key: str, instance_id: str, duration: int = SCRAPE_LOCK_TTL, 
+                       timeout: int = SCRAPE_WAIT_TIMEOUT) -> bool:
     start_time = time.time()
     attempt = 0
     
-    while (time.time() - start_time) < SCRAPE_WAIT_TIMEOUT:
+    while attempt == 0 or (time.time() - start_time) < timeout:
         attempt += 1
         try:
             current_time = int(time.time())
@@ -164,7 +240,7 @@ async def acquire_lock(lock_key: str, instance_id: str, duration: int = SCRAPE_L
                 return True
             
             # --- Check if timeout is exceeded ---
-            if (time.time() - start_time) >= SCRAPE_WAIT_TIMEOUT:
+            if (time.time() - start_time) >= timeout:
                 break
                 
             # --- Wait before retry ---
@@ -174,7 +250,7 @@ async def acquire_lock(lock_key: str, instance_id: str, duration: int = SCRAPE_L
         except Exception as e:
             logger.error(f"Lock attempt {attempt} failed for {lock_key}: {e}")
             # --- Check timeout before retry ---
-            if (time.time() - start_time) < SCRAPE_WAIT_TIMEOUT - 0.5:
+            if (time.time() - start_time) < timeout - 0.5:
                 await asyncio.sleep(0.5)
     
     elapsed_time = round((time.time() - start_time) * 1000)
@@ -193,24 +269,30 @@ async def release_lock(lock_key: str, instance_id: str):
 # --- Search lock context manager ---
 class SearchLock:
     
-    def __init__(self, content_type: str, title: str, year: Optional[str] = None):
+    def __init__(self, content_type: str, title: str, year: Optional[str] = None, 
+                 timeout: int = SCRAPE_WAIT_TIMEOUT):
         lock_key = create_cache_key(content_type, title, year)
         self.lock_key = lock_key
-        self.instance_id = f"wawacity_{int(time.time())}"
+        self.instance_id = f"wawacity_{uuid4().hex}"
         self.duration = SCRAPE_LOCK_TTL
+        self.timeout = timeout
         self.acquired = False
     
     async def __aenter__(self):
         start_time = time.time()
-        timeout = SCRAPE_WAIT_TIMEOUT
+        wait_start = time.perf_counter()
         
-        while time.time() - start_time < timeout:
-            self.acquired = await acquire_lock(self.lock_key, self.instance_id, self.duration)
+        while True:
+            self.acquired = await acquire_lock(self.lock_key, self.instance_id, self.duration, self.timeout)
             if self.acquired:
                 logger.log("LOCK", f"Acquired: {self.lock_key}")
-                return self
+                break
+            if time.time() - start_time >= self.timeout:
+                break
             await asyncio.sleep(1)
         
+        observe_stage("lock_wait", wait_start)
+        LOCK_ACQUISITIONS.labels("acquired" if self.acquired else "timeout").inc()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -1,6 +1,7 @@
 import json
+import hashlib
 from typing import Optional, Dict, Any
-from urllib.parse import quote_plus, urlparse, parse_qs, unquote
+from urllib.parse import quote_plus, unquote
 from base64 import b64encode, b64decode
 
 # --- Base64 encoding ---
@@ -14,25 +15,39 @@ def create_cache_key(cache_type: str, title: str, year: Optional[str] = None) ->
         cache_key += f":{year}"
     return cache_key
 
+# --- Resolved link cache key (API key never stored in clear) ---
+def create_link_cache_key(link: str, apikey: str) -> str:
+    apikey_hash = hashlib.sha256(apikey.encode()).hexdigest()[:16]
+    return f"{link}:{apikey_hash}"
+
+# --- Rendered stream response key (content, configuration and host) ---
+def create_stream_response_key(content_key: str, b64config: str, base_url: str) -> str:
+    fingerprint = hashlib.sha256(f"{base_url}|{b64config}".encode()).hexdigest()[:16]
+    return f"{content_key}|{fingerprint}"
+
 # --- Filename extraction from dl-protect links ---
 def extract_filename_from_link(url: str, link_text: str) -> str:
-    # --- First try from link text ---
-    original_filename = link_text.split(":")[-1].strip() if ":" in link_text else link_text.strip()
-    
-    # --- Then try decoding from URL ---
-    try:
-        parsed_url = urlparse(url)
-        query_params = parse_qs(parsed_url.query)
-        fn_encoded = query_params.get('fn', [None])[0]
+    # --- First try decoding the fn query parameter ---
+    query = url.partition("#")[0].partition("?")[2]
+    for param in query.split("&"):
+        if not param.startswith("fn="):
+            continue
+        fn_encoded = param[3:]
+        if not fn_encoded:
+            continue
         
-        if fn_encoded:
-            fn_unquoted = unquote(fn_encoded)
+        try:
+            # --- Same double unquoting as parse_qs followed by unquote ---
+            fn_unquoted = unquote(unquote(fn_encoded.replace("+", " ")))
             decoded_fn = b64decode(fn_unquoted).decode('utf-8')
-            return decoded_fn if decoded_fn else original_filename
-    except Exception:
-        pass
+            if decoded_fn:
+                return decoded_fn
+        except Exception:
+            pass
+        break
     
-    return original_filename
+    # --- Then fall back to link text ---
+    return link_text.split(":")[-1].strip() if ":" in link_text else link_text.strip()
 
 # --- URL formatting ---
 def format_url(url: str, base_url: str) -> str:
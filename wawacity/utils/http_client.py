@@ -1,43 +1,354 @@
+import ssl
+import time
+import asyncio
 import httpx
-from typing import Optional, Dict, Any
-from wawacity.core.config import PROXY_URL
+from importlib.util import find_spec
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator, List, Set, Tuple
+from wawacity.core.config import (
+    PROXY_URLS, PROXY_MAX_CONCURRENCY, PROXY_FAILURE_THRESHOLD, PROXY_RECOVERY_TIMEOUT,
+    HTTP_MAX_CONNECTIONS_PER_HOST, HTTP_HOST_LIMITS, HTTP2_ENABLED
+)
+from wawacity.utils.metrics import (
+    OUTBOUND_REQUESTS, OUTBOUND_LATENCY, OUTBOUND_QUEUE_WAIT,
+    OUTBOUND_POOL_IN_USE, OUTBOUND_POOL_QUEUED, OUTBOUND_POOL_LIMIT,
+    OUTBOUND_PROXY_REQUESTS, OUTBOUND_PROXY_LATENCY, OUTBOUND_PROXY_IN_USE
+)
+from wawacity.utils.retry import CircuitBreaker
+from wawacity.utils.logger import logger
+
+# --- Latency and error rate smoothing factor ---
+PROXY_ALPHA = 0.3
+
+# --- Weight of the recent error rate in the routing score ---
+PROXY_ERROR_PENALTY = 4
+
+# --- Failures while opening the connection, at the proxy or at the upstream behind it ---
+CONNECT_ERRORS = (httpx.ProxyError, httpx.ConnectError, httpx.ConnectTimeout)
+
+# --- Proxy replies meaning the upstream is unreachable, not the proxy (CONNECT 5xx, SOCKS reply) ---
+UPSTREAM_PROXY_REPLIES = ("500 ", "502 ", "503 ", "504 ", "Proxy Server could not connect")
+
+# --- Egress route: one proxy (or a direct connection) with health, latency and concurrency cap ---
+class ProxyRoute:
+    
+    def __init__(self, url: Optional[str], position: int, limit: int):
+        self.url = url
+        self.name = self._display_name(url)
+        self.position = position
+        self.limit = limit
+        self.in_use = 0
+        self.queued = 0
+        self.pending = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        self.breaker = CircuitBreaker(f"proxy {self.name}", PROXY_FAILURE_THRESHOLD, PROXY_RECOVERY_TIMEOUT, 1)
+    
+    # --- Proxy address without credentials, for logs, metrics and /health ---
+    @staticmethod
+    def _display_name(url: Optional[str]) -> str:
+        if url is None:
+            return "direct"
+        parsed = httpx.URL(url)
+        return f"{parsed.scheme}://{parsed.host}" + (f":{parsed.port}" if parsed.port else "")
+    
+    # --- Expected wait: smoothed latency times requests ahead, inflated by recent errors ---
+    def score(self, default_latency: float) -> float:
+        latency = self.latency if self.latency is not None else default_latency
+        return latency * (1 + self.pending) * (1 + PROXY_ERROR_PENALTY * self.error_rate)
+    
+    # --- Slot acquisition, capped across every host sent through this proxy ---
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        self.queued += 1
+        try:
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        
+        self.in_use += 1
+        OUTBOUND_PROXY_IN_USE.labels(self.name).inc()
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            OUTBOUND_PROXY_IN_USE.labels(self.name).dec()
+            if self._semaphore is not None:
+                self._semaphore.release()
+    
+    # --- Outcome recording ---
+    def _record(self, elapsed: float, error: bool, result: str):
+        self.requests += 1
+        self.errors += int(error)
+        self.error_rate = PROXY_ALPHA * error + (1 - PROXY_ALPHA) * self.error_rate
+        OUTBOUND_PROXY_REQUESTS.labels(self.name, result).inc()
+        OUTBOUND_PROXY_LATENCY.labels(self.name).observe(elapsed)
+    
+    def record_success(self, elapsed: float):
+        self._record(elapsed, False, "ok")
+        self.latency = elapsed if self.latency is None else PROXY_ALPHA * elapsed + (1 - PROXY_ALPHA) * self.latency
+        self.breaker.record_success()
+    
+    # --- Connection refused or failed at the proxy: counts toward ejection ---
+    def record_failure(self, elapsed: float):
+        self._record(elapsed, True, "connect_error")
+        self.breaker.record_failure()
+    
+    # --- Proxy answered but could not reach the upstream: the proxy itself is healthy ---
+    def record_upstream_failure(self, elapsed: float):
+        self._record(elapsed, False, "upstream_error")
+        self.breaker.record_success()
+    
+    # --- Whether a connection error proves this proxy is bad ---
+    def is_own_failure(self, error: Exception) -> bool:
+        if self.url is None:
+            return False
+        if isinstance(error, httpx.ProxyError):
+            return not str(error).startswith(UPSTREAM_PROXY_REPLIES)
+        
+        # --- TLS to the upstream through the tunnel also surfaces as ConnectError ---
+        cause = error.__cause__
+        while cause is not None:
+            if isinstance(cause, ssl.SSLError):
+                return False
+            cause = cause.__cause__
+        return True
+    
+    # --- Error once connected (e.g. upstream read timeout): only lowers the routing score ---
+    def record_error(self, elapsed: float):
+        self._record(elapsed, True, "error")
+        self.breaker.release_probe()
+    
+    # --- Statistics ---
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "proxy": self.name,
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "pending": self.pending,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            **self.breaker.stats()
+        }
+
+# --- Per-host connection pool and concurrency slots, one per host and proxy ---
+class HostPool:
+    
+    def __init__(self, host: str, limit: int, http2: bool, proxy_url: Optional[str]):
+        self.host = host
+        self.limit = limit
+        self.http2 = http2
+        self.in_use = 0
+        self.queued = 0
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        
+        proxies = {"all://": proxy_url} if proxy_url else None
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(15.0),
+            proxies=proxies,
+            follow_redirects=True,
+            http2=http2,
+            limits=httpx.Limits(max_connections=limit or None, max_keepalive_connections=limit or None)
+        )
+    
+    # --- Slot acquisition, bursts queue in arrival order ---
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        queue_start = time.perf_counter()
+        self.queued += 1
+        OUTBOUND_POOL_QUEUED.labels(self.host).inc()
+        try:
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+            OUTBOUND_POOL_QUEUED.labels(self.host).dec()
+        OUTBOUND_QUEUE_WAIT.labels(self.host).observe(time.perf_counter() - queue_start)
+        
+        self.in_use += 1
+        OUTBOUND_POOL_IN_USE.labels(self.host).inc()
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            OUTBOUND_POOL_IN_USE.labels(self.host).dec()
+            if self._semaphore is not None:
+                self._semaphore.release()
 
 class HTTPClient:
     
     _instance: Optional['HTTPClient'] = None
-    _client: Optional[httpx.AsyncClient] = None
+    _pools: Dict[Tuple[str, int], HostPool] = {}
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance.http2 = HTTP2_ENABLED and find_spec("h2") is not None
+            if HTTP2_ENABLED and not cls._instance.http2:
+                logger.error("HTTP2_ENABLED is set but the h2 package is missing, using HTTP/1.1")
+            cls._instance.routes = [
+                ProxyRoute(url, position, PROXY_MAX_CONCURRENCY) for position, url in enumerate(PROXY_URLS)
+            ] or [ProxyRoute(None, 0, 0)]
         return cls._instance
     
-    # --- Client initialization ---
-    async def get_client(self) -> httpx.AsyncClient:
-        if self._client is None:
-            proxies = {"all://": PROXY_URL} if PROXY_URL else None
-            self._client = httpx.AsyncClient(
-                timeout=httpx.Timeout(15.0),
-                proxies=proxies,
-                follow_redirects=True,
-                limits=httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    # --- Pool lookup, created on first request to a host through a proxy ---
+    def get_pool(self, host: str, route: ProxyRoute) -> HostPool:
+        pool = self._pools.get((host, route.position))
+        if pool is None:
+            pool = HostPool(host, self._host_limit(host), self.http2, route.url)
+            self._pools[(host, route.position)] = pool
+            # --- One pool per proxy, the gauge shows the host's total ---
+            OUTBOUND_POOL_LIMIT.labels(host).set(
+                sum(other.limit for (other_host, _), other in self._pools.items() if other_host == host)
             )
-        return self._client
+        return pool
+    
+    @staticmethod
+    def _host_limit(host: str) -> int:
+        for domain, limit in HTTP_HOST_LIMITS.items():
+            if host == domain or host.endswith(f".{domain}"):
+                return limit
+        return HTTP_MAX_CONNECTIONS_PER_HOST
+    
+    # --- Routes by expected wait, unknown latency counts as the best known one ---
+    def ranked_routes(self) -> List[ProxyRoute]:
+        known = [route.latency for route in self.routes if route.latency is not None]
+        default_latency = min(known) if known else 1.0
+        return sorted(self.routes, key=lambda route: (route.score(default_latency), route.position))
+    
+    def _select_route(self, tried: Set[ProxyRoute]) -> Optional[ProxyRoute]:
+        # --- Ejected proxies past their recovery timeout get one probe request ---
+        for route in self.routes:
+            if route not in tried and route.breaker.state == CircuitBreaker.OPEN and route.breaker.allow_request():
+                return route
+        
+        ranked = self.ranked_routes()
+        for route in ranked:
+            if route not in tried and route.breaker.allow_request():
+                return route
+        
+        # --- Every proxy ejected: still try the best one ---
+        if not tried:
+            return ranked[0]
+        return None
     
     # --- HTTP methods ---
     async def get(self, url: str, **kwargs) -> httpx.Response:
-        client = await self.get_client()
-        return await client.get(url, **kwargs)
+        return await self._send("get", url, **kwargs)
     
     async def post(self, url: str, **kwargs) -> httpx.Response:
-        client = await self.get_client()
-        return await client.post(url, **kwargs)
+        return await self._send("post", url, **kwargs)
+    
+    # --- Send through the best proxy, next one when that proxy could not be used ---
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        tried: Set[ProxyRoute] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            route = self._select_route(tried)
+            if route is None:
+                raise last_error
+            tried.add(route)
+            try:
+                return await self._send_via(route, method, url, **kwargs)
+            except CONNECT_ERRORS as e:
+                if not route.is_own_failure(e):
+                    raise
+                last_error = e
+                logger.error(f"Proxy {route.name} failed ({type(e).__name__}), retrying on another proxy")
+    
+    # --- Instrumented send through one proxy and its host pool ---
+    async def _send_via(self, route: ProxyRoute, method: str, url: str, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host or "unknown"
+        pool = self.get_pool(host, route)
+        
+        # --- Routed requests, host queue included, so bursts spread across proxies ---
+        route.pending += 1
+        recorded = False
+        try:
+            async with pool.slot(), route.slot():
+                start_time = time.perf_counter()
+                try:
+                    response = await getattr(pool.client, method)(url, **kwargs)
+                except CONNECT_ERRORS as e:
+                    OUTBOUND_REQUESTS.labels(host, "error").inc()
+                    recorded = True
+                    if route.is_own_failure(e):
+                        route.record_failure(time.perf_counter() - start_time)
+                    else:
+                        route.record_upstream_failure(time.perf_counter() - start_time)
+                    raise
+                except Exception:
+                    OUTBOUND_REQUESTS.labels(host, "error").inc()
+                    recorded = True
+                    route.record_error(time.perf_counter() - start_time)
+                    raise
+                finally:
+                    OUTBOUND_LATENCY.labels(host).observe(time.perf_counter() - start_time)
+            
+            # --- Proxy refused the request itself ---
+            recorded = True
+            if response.status_code == 407:
+                route.record_failure(time.perf_counter() - start_time)
+            else:
+                route.record_success(time.perf_counter() - start_time)
+        finally:
+            route.pending -= 1
+            # --- Cancelled while queued or in flight: free a half-open probe slot ---
+            if not recorded:
+                route.breaker.release_probe()
+        
+        OUTBOUND_REQUESTS.labels(host, str(response.status_code)).inc()
+        return response
+    
+    # --- Health probe of every configured proxy, outside breakers and latency scores ---
+    async def probe_proxies(self, url: str, timeout: float) -> List[Dict[str, Any]]:
+        host = httpx.URL(url).host or "unknown"
+        
+        async def check(route: ProxyRoute) -> Dict[str, Any]:
+            start_time = time.perf_counter()
+            try:
+                response = await self.get_pool(host, route).client.get(url, timeout=timeout)
+                status = "ok" if response.status_code == 200 else f"HTTP {response.status_code}"
+            except Exception as e:
+                status = f"unreachable: {e}"
+            return {
+                **route.stats(),
+                "status": status,
+                "response_time_ms": round((time.perf_counter() - start_time) * 1000)
+            }
+        
+        return list(await asyncio.gather(*[check(route) for route in self.routes if route.url]))
+    
+    # --- Statistics ---
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        hosts: Dict[str, Dict[str, Any]] = {}
+        for pool in self._pools.values():
+            entry = hosts.setdefault(pool.host, {"limit": 0, "in_use": 0, "queued": 0, "proxies": 0, "http2": pool.http2})
+            entry["limit"] += pool.limit
+            entry["in_use"] += pool.in_use
+            entry["queued"] += pool.queued
+            entry["proxies"] += 1
+        for entry in hosts.values():
+            entry["utilization"] = round(entry["in_use"] / entry["limit"], 3) if entry["limit"] else None
+        return hosts
+    
+    def proxy_stats(self) -> List[Dict[str, Any]]:
+        return [route.stats() for route in self.ranked_routes() if route.url]
     
     # --- Cleanup ---
     async def close(self):
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        pools = list(self._pools.values())
+        self._pools.clear()
+        for pool in pools:
+            OUTBOUND_POOL_LIMIT.labels(pool.host).set(0)
+            await pool.client.aclose()
 
 # --- Global instance ---
-http_client = HTTPClient()
\ No newline at end of file
+http_client = HTTPClient()
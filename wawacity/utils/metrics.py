@@ -0,0 +1,86 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Latency buckets from cache hits to multi-page scrapes ---
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# --- Stream pipeline ---
+STAGE_LATENCY = Histogram(
+    "wawacity_stage_duration_seconds",
+    "Duration of each stream pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "wawacity_cache_lookups_total",
+    "Cache lookups by cache and result (hit, stale, miss)",
+    ["cache", "result"]
+)
+SCRAPES_IN_FLIGHT = Gauge(
+    "wawacity_scrapes_in_flight",
+    "Wawacity scrapes currently running in this worker"
+)
+
+# --- Locks ---
+LOCK_ACQUISITIONS = Counter(
+    "wawacity_lock_acquisitions_total",
+    "Scrape lock acquisition attempts by outcome",
+    ["result"]
+)
+
+# --- Outbound HTTP ---
+OUTBOUND_REQUESTS = Counter(
+    "wawacity_outbound_requests_total",
+    "Outbound HTTP requests by host and status",
+    ["host", "status"]
+)
+OUTBOUND_LATENCY = Histogram(
+    "wawacity_outbound_request_duration_seconds",
+    "Outbound HTTP request duration by host",
+    ["host"],
+    buckets=LATENCY_BUCKETS
+)
+
+OUTBOUND_QUEUE_WAIT = Histogram(
+    "wawacity_outbound_queue_wait_seconds",
+    "Time spent waiting for a per-host connection slot",
+    ["host"],
+    buckets=LATENCY_BUCKETS
+)
+OUTBOUND_POOL_IN_USE = Gauge(
+    "wawacity_outbound_pool_in_use",
+    "Outbound requests currently holding a per-host slot",
+    ["host"]
+)
+OUTBOUND_POOL_QUEUED = Gauge(
+    "wawacity_outbound_pool_queued",
+    "Outbound requests waiting for a per-host slot",
+    ["host"]
+)
+OUTBOUND_POOL_LIMIT = Gauge(
+    "wawacity_outbound_pool_limit",
+    "Per-host concurrency limit summed over proxies (0 = unlimited)",
+    ["host"]
+)
+
+# --- Outbound proxies ---
+OUTBOUND_PROXY_REQUESTS = Counter(
+    "wawacity_outbound_proxy_requests_total",
+    "Outbound requests by proxy and outcome (ok, error, connect_error, upstream_error)",
+    ["proxy", "result"]
+)
+OUTBOUND_PROXY_LATENCY = Histogram(
+    "wawacity_outbound_proxy_request_duration_seconds",
+    "Outbound request duration by proxy",
+    ["proxy"],
+    buckets=LATENCY_BUCKETS
+)
+OUTBOUND_PROXY_IN_USE = Gauge(
+    "wawacity_outbound_proxy_in_use",
+    "Outbound requests currently holding a proxy slot",
+    ["proxy"]
+)
+
+# --- Stage timing helper ---
+def observe_stage(stage: str, start_time: float):
+    STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start_time)
@@ -0,0 +1,202 @@
+import asyncio
+import time
+import httpx
+from typing import Optional, List, Dict, Any, Set
+from wawacity.core.config import (
+    WAWACITY_URL, WAWACITY_MIRRORS, MIRROR_HEDGE_DELAY, MIRROR_FAILURE_THRESHOLD, MIRROR_RECOVERY_TIMEOUT
+)
+from wawacity.utils.http_client import http_client
+from wawacity.utils.retry import CircuitBreaker
+from wawacity.utils.logger import logger
+
+# --- Latency smoothing factor ---
+LATENCY_ALPHA = 0.3
+
+# --- Single Wawacity domain with health and latency ---
+class Mirror:
+    
+    def __init__(self, base_url: str, position: int):
+        self.base_url = base_url
+        self.position = position
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.breaker = CircuitBreaker(
+            f"mirror {httpx.URL(base_url).host}",
+            MIRROR_FAILURE_THRESHOLD,
+            MIRROR_RECOVERY_TIMEOUT,
+            1
+        )
+    
+    # --- Lower is better, unknown latency counts as the hedge delay ---
+    def score(self) -> float:
+        latency = self.latency if self.latency is not None else MIRROR_HEDGE_DELAY
+        return latency * (1 + self.breaker.failures)
+    
+    # --- Outcome recording ---
+    def record_latency(self, elapsed: float):
+        self.latency = elapsed if self.latency is None else LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency
+    
+    def record_success(self, elapsed: float):
+        self.requests += 1
+        self.record_latency(elapsed)
+        self.breaker.record_success()
+    
+    def record_failure(self):
+        self.requests += 1
+        self.errors += 1
+        self.breaker.record_failure()
+    
+    # --- Statistics ---
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.base_url,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            **self.breaker.stats()
+        }
+
+class MirrorPool:
+    
+    def __init__(self, base_urls: List[str], hedge_delay: float):
+        self.hedge_delay = hedge_delay
+        self.mirrors = [Mirror(base_url, position) for position, base_url in enumerate(base_urls)]
+        self._recovery_tasks: Set[asyncio.Task] = set()
+    
+    # --- Healthy mirrors first, then by score, configuration order on ties ---
+    def ranked(self) -> List[Mirror]:
+        return sorted(self.mirrors, key=lambda m: (m.breaker.state == CircuitBreaker.OPEN, m.score(), m.position))
+    
+    # --- User requests only go to healthy mirrors, recovering ones are probed in the background ---
+    def _select(self, tried: Set[Mirror]) -> Optional[Mirror]:
+        self._schedule_recovery()
+        for mirror in self.ranked():
+            if mirror not in tried and mirror.breaker.state == CircuitBreaker.CLOSED:
+                return mirror
+        
+        # --- Every mirror degraded: still try the best one ---
+        if not tried:
+            return self.ranked()[0]
+        return None
+    
+    # --- Page fetch with failover, hedged on the next best mirror when slow ---
+    async def get(self, path: str, headers: Optional[Dict[str, str]] = None, hedge: bool = False) -> httpx.Response:
+        tried: Set[Mirror] = set()
+        tasks: Dict[asyncio.Task, Mirror] = {}
+        last_response: Optional[httpx.Response] = None
+        last_error: Optional[Exception] = None
+        
+        def launch() -> bool:
+            mirror = self._select(tried)
+            if mirror is None:
+                return False
+            tried.add(mirror)
+            tasks[asyncio.create_task(self._request(mirror, path, headers))] = mirror
+            return True
+        
+        launch()
+        try:
+            while tasks:
+                timeout = self.hedge_delay if hedge and len(tried) < 2 else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                # --- Best mirror is slow: race the next best ---
+                if not done:
+                    if launch():
+                        logger.log("SCRAPER", f"Hedging {path or '/'} on {len(tried)} mirrors")
+                    else:
+                        hedge = False
+                    continue
+                
+                for task in done:
+                    tasks.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if response.status_code < 500 and response.status_code != 429:
+                        return response
+                    last_response = response
+                
+                # --- Fail over once nothing is left in flight ---
+                if not tasks:
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if last_response is not None:
+            return last_response
+        raise last_error or RuntimeError("No Wawacity mirror available")
+    
+    async def _request(self, mirror: Mirror, path: str, headers: Optional[Dict[str, str]]) -> httpx.Response:
+        start_time = time.perf_counter()
+        try:
+            response = await http_client.get(f"{mirror.base_url}/{path}", headers=headers)
+        except asyncio.CancelledError:
+            # --- Lost a hedged race: elapsed time is a lower bound of its latency ---
+            mirror.record_latency(time.perf_counter() - start_time)
+            mirror.breaker.release_probe()
+            raise
+        except Exception:
+            mirror.record_failure()
+            raise
+        
+        if response.status_code >= 500 or response.status_code == 429:
+            mirror.record_failure()
+        else:
+            mirror.record_success(time.perf_counter() - start_time)
+        return response
+    
+    # --- Skipped mirrors past their recovery timeout get one background probe ---
+    def _schedule_recovery(self):
+        for mirror in self.mirrors:
+            if mirror.breaker.state == CircuitBreaker.OPEN and mirror.breaker.allow_request():
+                task = asyncio.create_task(self._recover(mirror))
+                self._recovery_tasks.add(task)
+                task.add_done_callback(self._recovery_tasks.discard)
+    
+    async def _recover(self, mirror: Mirror):
+        try:
+            await self._request(mirror, "", None)
+        except Exception as e:
+            logger.log("SCRAPER", f"Mirror {mirror.base_url} still unreachable: {e}")
+    
+    # --- Health probe of every mirror, kept out of the breakers and latency scores ---
+    async def probe(self, timeout: float) -> List[Dict[str, Any]]:
+        async def check(mirror: Mirror) -> Dict[str, Any]:
+            start_time = time.perf_counter()
+            try:
+                response = await http_client.get(f"{mirror.base_url}/", timeout=timeout)
+                status = "ok" if response.status_code == 200 else f"HTTP {response.status_code}"
+            except Exception as e:
+                status = f"unreachable: {e}"
+            return {
+                **mirror.stats(),
+                "status": status,
+                "response_time_ms": round((time.perf_counter() - start_time) * 1000)
+            }
+        
+        return list(await asyncio.gather(*[check(mirror) for mirror in self.mirrors]))
+    
+    # --- Canonical WAWACITY_URL page to mirror-relative path ---
+    @staticmethod
+    def relative_path(url: str) -> Optional[str]:
+        prefix = f"{WAWACITY_URL.rstrip('/')}/"
+        if url.startswith(prefix):
+            return url[len(prefix):]
+        if url == WAWACITY_URL.rstrip("/"):
+            return ""
+        return None
+    
+    # --- Statistics ---
+    def stats(self) -> List[Dict[str, Any]]:
+        return [mirror.stats() for mirror in self.ranked()]
+
+# --- Global instance ---
+mirror_pool = MirrorPool(
+    list(dict.fromkeys([WAWACITY_URL.rstrip("/"), *WAWACITY_MIRRORS])),
+    MIRROR_HEDGE_DELAY
+)
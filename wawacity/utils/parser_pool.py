@@ -0,0 +1,52 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from wawacity.core.config import PARSER_POOL_MODE, PARSER_POOL_WORKERS
+from wawacity.utils.logger import logger
+
+class ParserPool:
+    
+    def __init__(self, mode: str, workers: int):
+        self.mode = mode if mode in ("thread", "process", "inline") else "thread"
+        self.workers = max(1, workers)
+        self._executor: Optional[Executor] = None
+    
+    # --- Lazy executor creation ---
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # --- Spawned workers never inherit the event loop or open sockets ---
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="wawacity-parser"
+                )
+        return self._executor
+    
+    # --- Off-loop parsing ---
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        if self.mode == "inline":
+            return func(*args)
+        
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            logger.error("Parser process pool crashed, restarting it")
+            self._executor = None
+            raise
+    
+    # --- Shutdown ---
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# --- Global instance ---
+parser_pool = ParserPool(PARSER_POOL_MODE, PARSER_POOL_WORKERS)
@@ -0,0 +1,67 @@
+import time
+from typing import Optional, Dict, List, Any
+from wawacity.utils.helpers import create_cache_key
+from wawacity.utils.logger import logger
+
+class PopularityTracker:
+    
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, Any]] = {}
+    
+    # --- Request counting (in memory, flushed periodically) ---
+    def record(self, content_type: str, title: str, year: Optional[str], imdb_id: str):
+        cache_key = create_cache_key(content_type, title, year)
+        entry = self._pending.get(cache_key)
+        if entry is None:
+            entry = self._pending[cache_key] = {
+                "cache_key": cache_key,
+                "content_type": content_type,
+                "title": title,
+                "year": year or "",
+                "imdb_id": imdb_id,
+                "hits": 0
+            }
+        entry["hits"] += 1
+    
+    # --- Counter flush ---
+    async def flush(self, database):
+        if not self._pending:
+            return
+        
+        pending = list(self._pending.values())
+        self._pending = {}
+        last_seen = int(time.time())
+        
+        await database.execute_many(
+            """INSERT INTO popularity (cache_key, content_type, title, year, imdb_id, hits, last_seen) 
+               VALUES (:cache_key, :content_type, :title, :year, :imdb_id, :hits, :last_seen) 
+               ON CONFLICT (cache_key) DO UPDATE 
+               SET hits = popularity.hits + excluded.hits, imdb_id = excluded.imdb_id, last_seen = excluded.last_seen""",
+            [{**entry, "last_seen": last_seen} for entry in pending]
+        )
+        logger.log("CACHE", f"Recorded popularity for {len(pending)} keys")
+    
+    # --- Hottest keys expiring soon ---
+    async def hottest_expiring(self, database, refresh_before: float, stale_limit: float, 
+                               min_hits: int, seen_since: float, limit: int) -> List[Dict[str, Any]]:
+        rows = await database.fetch_all(
+            """SELECT p.content_type, p.title, p.year, p.hits FROM popularity p 
+               JOIN content_cache c ON c.cache_key = p.cache_key 
+               WHERE c.expires_at < :refresh_before AND c.expires_at > :stale_limit 
+               AND p.hits >= :min_hits AND p.last_seen > :seen_since 
+               ORDER BY p.hits DESC LIMIT :limit""",
+            {
+                "refresh_before": refresh_before,
+                "stale_limit": stale_limit,
+                "min_hits": min_hits,
+                "seen_since": seen_since,
+                "limit": limit
+            }
+        )
+        return [
+            {"content_type": row["content_type"], "title": row["title"], "year": row["year"] or None, "hits": row["hits"]}
+            for row in rows
+        ]
+
+# --- Global instance ---
+popularity_tracker = PopularityTracker()
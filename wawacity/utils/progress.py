@@ -0,0 +1,46 @@
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+class ScrapeProgress:
+    
+    def __init__(self):
+        self._pages: Dict[int, List[Dict]] = {}
+        self._changed: Optional[asyncio.Future] = None
+        self.skipped = False  # Gave up because another instance holds the scrape lock
+    
+    # --- Page results, kept in page order ---
+    def add(self, index: int, results: List[Dict]):
+        self._pages[index] = results
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = None
+    
+    def results(self) -> List[Dict]:
+        return [result for index in sorted(self._pages) for result in self._pages[index]]
+    
+    # --- Results matching a filter and how many pages contributed ---
+    def matching(self, match: Callable[[Dict], bool]) -> Tuple[List[Dict], int]:
+        matched = []
+        pages = 0
+        for index in sorted(self._pages):
+            page_matches = [result for result in self._pages[index] if match(result)]
+            if page_matches:
+                matched.extend(page_matches)
+                pages += 1
+        return matched, pages
+    
+    @property
+    def pages(self) -> int:
+        return len(self._pages)
+    
+    # --- Resolves on the next completed page ---
+    def changed(self) -> asyncio.Future:
+        if self._changed is None:
+            self._changed = asyncio.get_running_loop().create_future()
+        return self._changed
+    
+    # --- Drain an incremental scraper ---
+    async def consume(self, pages: AsyncIterator[Tuple[int, List[Dict]]]) -> List[Dict]:
+        async for index, results in pages:
+            self.add(index, results)
+        return self.results()
@@ -0,0 +1,125 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+import httpx
+from wawacity.utils.logger import logger
+
+# --- Exponential backoff with full jitter ---
+class RetryPolicy:
+    
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float, max_total_delay: Optional[float] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_delay = max_total_delay
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None, waited: float = 0.0) -> float:
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay)
+        else:
+            ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+            delay = round(random.uniform(0, ceiling), 2)
+        
+        # --- Never sleep past the total budget ---
+        if self.max_total_delay is not None:
+            delay = min(delay, max(0.0, self.max_total_delay - waited))
+        return delay
+    
+    def exhausted(self, waited: float) -> bool:
+        return self.max_total_delay is not None and waited >= self.max_total_delay
+
+# --- Retry-After header parsing (seconds or HTTP date) ---
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreakerOpen(Exception):
+    pass
+
+# --- Shared circuit breaker ---
+class CircuitBreaker:
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_requests: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_requests = half_open_requests
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+    
+    # --- Admission ---
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if time.time() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+            logger.info(f"Circuit {self.name} half-open, probing upstream")
+        
+        if self.state == self.HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_requests:
+                return False
+            self.probes_in_flight += 1
+        
+        return True
+    
+    # --- Outcome recording ---
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_requests:
+                self.state = self.CLOSED
+                self.failures = 0
+                logger.info(f"Circuit {self.name} closed")
+            return
+        
+        self.failures = 0
+    
+    def record_failure(self):
+        if self.state == self.HALF_OPEN:
+            self._open()
+            return
+        
+        self.failures += 1
+        if self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+    
+    # --- Probe abandoned without an outcome (e.g. lost a hedged race) ---
+    def release_probe(self):
+        if self.state == self.HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        logger.error(f"Circuit {self.name} open for {self.recovery_timeout}s after {self.failures} failures")
+    
+    # --- Statistics ---
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures
+        }
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from wawacity.utils.logger import logger
+
+class SingleFlight:
+    
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+    
+    # --- Coalesced execution ---
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        # --- Shield so one cancelled caller does not cancel the others ---
+        return await asyncio.shield(self.start(key, func))
+    
+    # --- Shared task, started synchronously so callers can attach state to it ---
+    def start(self, key: str, func: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.log("LOCK", f"Joined in-flight: {key}")
+        return task
+    
+    # --- Task cleanup ---
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+    
+    # --- In-flight state ---
+    def is_running(self, key: str) -> bool:
+        return key in self._tasks
+    
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+# --- Global instance ---
+single_flight = SingleFlight()